@@ -27,7 +27,8 @@ bl_info = {
 from . import auto_load, btypes
 
 btypes.configure(addon_string="sd")
-auto_load.init()
+# Operators in these packages are only imported when they are first used
+auto_load.init(lazy=("general.operators", "node_editor.operators"))
 
 
 def register():
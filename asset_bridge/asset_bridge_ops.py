@@ -4,6 +4,7 @@ from bpy.types import Operator
 from mathutils import Vector
 
 from ..btypes import BOperator
+from ..handlers import AppTimer
 
 
 @BOperator()
@@ -64,5 +65,5 @@ class SD_OT_dummy_import(Operator):
             print("ho")
             return 0.02
 
-        bpy.app.timers.register(update_progress, first_interval=0.02)
+        AppTimer(update_progress, first_interval=0.02)
         return {"FINISHED"}
@@ -1,30 +1,90 @@
 import importlib
 import inspect
+import json
+import os
 import pkgutil
+import sys
 import typing
+from collections import deque
 from pathlib import Path
 from types import ModuleType
 
 import bpy
 
+from . import lazy_operators
+from .constants import Dirs
+from .profiler import ProfileCategory, profile
+
 __all__ = (
     "init",
     "register",
     "unregister",
 )
 
+# This holds the registration state of the whole addon, so it can't be hot reloaded
+__no_reload__ = True
+
 blender_version = bpy.app.version
 
 modules: list[ModuleType] = []
 ordered_classes: list[object] = []
+lazy_packages: tuple[str] = ()
+# Modules that are only imported manually, so they aren't loaded when the addon is enabled
+SKIPPED_MODULES = {"benchmarks"}
+# The modification times and sizes of the source files when they were last loaded, used for hot reloading
+source_files: dict[str, list[int]] = {}
+
 
+def init(use_manifest: bool = True, lazy: tuple[str] = ()):
+    """Find all submodules and the order to register their classes in.
+    If use_manifest is True, the result is cached on disk and reused until a source file changes.
 
-def init():
+    lazy: Subpackages (e.g. "general.operators") containing operator modules that should only be imported
+        when the operators are first used. This only has an effect when the manifest is up to date,
+        see lazy_operators.py for more details."""
     global modules
     global ordered_classes
-
-    modules = get_all_submodules(Path(__file__).parent)
-    ordered_classes = get_ordered_classes_to_register(modules)
+    global lazy_packages
+    global source_files
+
+    directory = Path(__file__).parent
+    lazy_packages = tuple(lazy)
+    with profile(ProfileCategory.LOADER, "auto_load.init"):
+        source_files = get_source_files(directory)
+        modules, ordered_classes = load_registration_info(
+            directory,
+            use_manifest=use_manifest,
+            lazy_packages=lazy_packages,
+            source_files=source_files,
+        )
+
+
+def load_registration_info(
+    directory: Path,
+    use_manifest: bool = True,
+    save: bool = True,
+    lazy_packages=(),
+    source_files: dict = None,
+):
+    """Return the submodules of the given directory, and the classes to register in order."""
+    if use_manifest:
+        with profile(ProfileCategory.LOADER, "Read manifest"):
+            signature = get_source_signature(directory, lazy_packages, source_files)
+            manifest = load_manifest(signature)
+        if manifest:
+            try:
+                return load_from_manifest(manifest, directory.name)
+            except (ImportError, AttributeError, KeyError, TypeError, ValueError):
+                # The manifest is out of date in a way the signature didn't catch, so rebuild it.
+                pass
+
+    modules = get_all_submodules(directory)
+    with profile(ProfileCategory.LOADER, "Find registration order"):
+        ordered_classes = get_ordered_classes_to_register(modules)
+    if use_manifest and save:
+        with profile(ProfileCategory.LOADER, "Write manifest"):
+            save_manifest(signature, modules, ordered_classes, directory.name, lazy_packages)
+    return modules, ordered_classes
 
 
 def register():
@@ -39,11 +99,13 @@ def register():
             ordered_classes.remove(cls)
 
     for cls in ordered_classes:
-        bpy.utils.register_class(cls)
+        with profile(ProfileCategory.REGISTER_CLASS, cls.__name__):
+            bpy.utils.register_class(cls)
 
     for module in modules.copy():
         if hasattr(module, "register"):
-            module.register()
+            with profile(ProfileCategory.REGISTER_MODULE, module.__name__):
+                module.register()
 
 
 def unregister():
@@ -65,11 +127,20 @@ def get_all_submodules(directory):
 
 def iter_submodules(path, package_name):
     for name in sorted(iter_submodule_names(path)):
-        yield importlib.import_module("." + name, package_name)
+        yield import_submodule(name, package_name)
+
+
+def import_submodule(name: str, package_name: str) -> ModuleType:
+    """Import a submodule, recording how long it takes.
+    If it imports other submodules, the time is also recorded for those individually."""
+    with profile(ProfileCategory.IMPORT, name):
+        return importlib.import_module("." + name, package_name)
 
 
 def iter_submodule_names(path, root=""):
     for _, module_name, is_package in pkgutil.iter_modules([str(path)]):
+        if root + module_name in SKIPPED_MODULES:
+            continue
         if is_package:
             sub_path = path / module_name
             sub_root = root + module_name + "."
@@ -78,6 +149,118 @@ def iter_submodule_names(path, root=""):
             yield root + module_name
 
 
+# Registration manifest
+#################################################
+
+# Increment this when the structure of the manifest changes.
+MANIFEST_VERSION = 4
+
+
+def get_manifest_path() -> Path:
+    return Dirs.CACHE_DIR / "registration_manifest.json"
+
+
+def get_source_signature(directory: Path, lazy_packages=(), source_files: dict = None) -> dict:
+    """Get the modification times and sizes of all source files, used to check if the manifest is up to date."""
+    return {
+        "version": MANIFEST_VERSION,
+        "blender": list(blender_version),
+        "python": list(sys.version_info[:2]),
+        "lazy_packages": sorted(lazy_packages),
+        "files": get_source_files(directory) if source_files is None else source_files,
+    }
+
+
+def get_source_files(directory: Path) -> dict[str, list[int]]:
+    """Get the modification time and size of each python file, keyed by its path relative to the directory."""
+    files = {}
+    for root, dirnames, filenames in os.walk(directory):
+        dirnames[:] = sorted(d for d in dirnames if d != "__pycache__" and not d.startswith("."))
+        for filename in sorted(filenames):
+            if not filename.endswith(".py"):
+                continue
+            path = Path(root) / filename
+            stat = path.stat()
+            files[path.relative_to(directory).as_posix()] = [stat.st_mtime_ns, stat.st_size]
+    return files
+
+
+def load_manifest(signature: dict) -> dict | None:
+    """Load the manifest from disk, returning None if it doesn't exist or is out of date."""
+    try:
+        with open(get_manifest_path(), "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(manifest, dict) or manifest.get("signature") != signature:
+        return None
+    return manifest
+
+
+def save_manifest(signature: dict, modules: list[ModuleType], ordered_classes: list, package_name: str, lazy_packages):
+    """Write the manifest to disk. This is written to a temporary file first,
+    so that other Blender instances starting at the same time never read a partially written file."""
+    prefix = package_name + "."
+    manifest = {
+        "signature": signature,
+        "modules": [module.__name__.removeprefix(prefix) for module in modules],
+        # The module each class is defined in, in the order that they need to be registered
+        "classes": [[cls.__module__.removeprefix(prefix), cls.__name__] for cls in ordered_classes],
+        # The data needed to register proxies for the operators in modules that can be loaded lazily
+        "lazy": get_lazy_modules_data(modules, ordered_classes, package_name, lazy_packages),
+    }
+
+    path = get_manifest_path()
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Could not save registration manifest: {e}")
+
+
+def get_lazy_modules_data(modules: list[ModuleType], ordered_classes: list, package_name: str, lazy_packages):
+    lazy_prefixes = tuple(f"{package_name}.{package}." for package in lazy_packages)
+    data = {}
+    for module in modules:
+        if not module.__name__.startswith(lazy_prefixes):
+            continue
+        try:
+            module_data = lazy_operators.get_lazy_module_data(module, ordered_classes)
+        except lazy_operators.NotLazyError:
+            continue
+        data[module.__name__.removeprefix(package_name + ".")] = module_data
+    return data
+
+
+def load_from_manifest(manifest: dict, package_name: str):
+    """Import the modules listed in the manifest, and get the classes to register from them.
+    Modules that can be loaded lazily are not imported, and proxies are registered for their operators instead."""
+    lazy_modules = manifest["lazy"]
+    modules = [import_submodule(name, package_name) for name in manifest["modules"] if name not in lazy_modules]
+
+    proxies = {}
+    for module_name, data in lazy_modules.items():
+        with profile(ProfileCategory.LOADER, f"Create lazy operators for {module_name}"):
+            proxies[module_name] = lazy_operators.load_lazy_module(f"{package_name}.{module_name}", data)
+
+    ordered_classes = []
+    for module_name, class_name in manifest["classes"]:
+        if module_name in proxies:
+            ordered_classes.append(proxies[module_name][class_name])
+            continue
+
+        module = importlib.import_module("." + module_name, package_name)
+        cls = getattr(module, class_name)
+        if not inspect.isclass(cls):
+            raise TypeError(f"{module_name}.{class_name} is not a class")
+        ordered_classes.append(cls)
+    return modules, ordered_classes
+
+
 # Find classes to register
 #################################################
 
@@ -177,15 +360,44 @@ def get_register_base_types():
 
 
 def toposort(deps_dict):
+    """Order the values so that every value comes after all of its dependencies, in O(V + E) time.
+    Dependencies that aren't keys of deps_dict are ignored.
+    Raises a ValueError naming the classes involved if there is a circular dependency."""
+    dependents = {value: [] for value in deps_dict}
+    indegrees = {}
+    for value, deps in deps_dict.items():
+        indegree = 0
+        for dep in deps:
+            if dep in dependents:
+                dependents[dep].append(value)
+                indegree += 1
+        indegrees[value] = indegree
+
+    queue = deque(value for value, indegree in indegrees.items() if indegree == 0)
     sorted_list = []
-    sorted_values = set()
-    while len(deps_dict) > 0:
-        unsorted = []
-        for value, deps in deps_dict.items():
-            if len(deps) == 0:
-                sorted_list.append(value)
-                sorted_values.add(value)
-            else:
-                unsorted.append(value)
-        deps_dict = {value: deps_dict[value] - sorted_values for value in unsorted}
+    while queue:
+        value = queue.popleft()
+        sorted_list.append(value)
+        for dependent in dependents[value]:
+            indegrees[dependent] -= 1
+            if indegrees[dependent] == 0:
+                queue.append(dependent)
+
+    if len(sorted_list) != len(deps_dict):
+        unsorted = {value for value, indegree in indegrees.items() if indegree > 0}
+        cycle = " -> ".join(getattr(value, "__name__", repr(value)) for value in find_cycle(unsorted, deps_dict))
+        raise ValueError(f"Cannot find an order to register classes in, as they depend on each other: {cycle}")
     return sorted_list
+
+
+def find_cycle(unsorted: set, deps_dict) -> list:
+    """Find a dependency cycle within the values that couldn't be sorted.
+    Each of them has at least one unsorted dependency, so following them will always end up in a cycle."""
+    value = next(iter(unsorted))
+    path = []
+    positions = {}
+    while value not in positions:
+        positions[value] = len(path)
+        path.append(value)
+        value = next(dep for dep in deps_dict[value] if dep in unsorted)
+    return path[positions[value] :] + [value]
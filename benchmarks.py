@@ -0,0 +1,369 @@
+import random
+import statistics
+import subprocess
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import blf
+import bpy
+from bpy.props import BoolProperty, CollectionProperty, FloatVectorProperty, IntProperty, StringProperty
+from bpy.types import PropertyGroup, bpy_prop_collection
+
+from . import auto_load
+from .btypes import BPropertyGroupBase, compile_path_template, split_data_path
+from .drawing import DrawList, text_metrics, wrap_lines
+from .math import Line, Rectangle
+
+"""Benchmarks for measuring the performance of the addon.
+This module is skipped by auto_load, so it isn't imported when the addon is enabled.
+Instead, import it and call the benchmarks from the Blender python console, e.g.:
+```
+from sd_tools import benchmarks
+benchmarks.bench_startup()
+```"""
+
+
+def print_timings(name: str, timings: list[float]):
+    """Print a summary of a list of timings in seconds"""
+    print(
+        f"{name}: median {statistics.median(timings) * 1000:.2f}ms, "
+        f"min {min(timings) * 1000:.2f}ms, max {max(timings) * 1000:.2f}ms ({len(timings)} runs)"
+    )
+
+
+# STARTUP
+
+
+# Run in a fresh background Blender instance, printing the time it takes to enable the addon.
+STARTUP_SCRIPT = """
+import time, addon_utils
+start = time.perf_counter()
+addon_utils.enable({package!r}, default_set=False)
+print("SD_STARTUP_TIME", time.perf_counter() - start)
+"""
+
+
+def time_startup(package: str) -> float:
+    """Start a new background instance of Blender, and return the time it took to enable the addon."""
+    result = subprocess.run(
+        [
+            bpy.app.binary_path,
+            "--background",
+            "--factory-startup",
+            "--python-expr",
+            STARTUP_SCRIPT.format(package=package),
+        ],
+        capture_output=True,
+        text=True,
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith("SD_STARTUP_TIME"):
+            return float(line.split()[1])
+    raise RuntimeError(f"Could not get the startup time:\n{result.stdout}\n{result.stderr}")
+
+
+def bench_startup(runs: int = 5):
+    """Compare the time it takes to enable the addon in a new headless Blender instance,
+    with (warm) and without (cold) an up to date registration manifest."""
+    package = __package__
+    manifest_path = auto_load.get_manifest_path()
+
+    cold = []
+    for _ in range(runs):
+        manifest_path.unlink(missing_ok=True)
+        cold.append(time_startup(package))
+
+    # The last cold run has written a new manifest
+    warm = [time_startup(package) for _ in range(runs)]
+
+    print_timings("Cold startup", cold)
+    print_timings("Warm startup", warm)
+    return cold, warm
+
+
+def bench_discovery(runs: int = 20):
+    """Compare the time taken by auto_load to find the modules and classes to register in the current session,
+    with and without the manifest. Modules are already imported, so this only measures the discovery itself."""
+    directory = Path(auto_load.__file__).parent
+
+    def run(use_manifest: bool):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            auto_load.load_registration_info(
+                directory,
+                use_manifest=use_manifest,
+                save=False,
+                lazy_packages=auto_load.lazy_packages,
+            )
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    print_timings("Discovery without manifest", run(use_manifest=False))
+    print_timings("Discovery with manifest", run(use_manifest=True))
+
+
+# REGISTRATION ORDER
+
+
+def create_class_graph(size: int, max_deps: int = 3, seed: int = 0) -> dict[type, set[type]]:
+    """Create a random acyclic graph of classes in the same form as auto_load.get_register_deps_dict,
+    imitating panels with parents and property groups that point to other property groups."""
+    rng = random.Random(seed)
+    classes = [type(f"SD_PT_class_{i}", (), {}) for i in range(size)]
+    deps_dict = {}
+    for i, cls in enumerate(classes):
+        count = rng.randint(0, min(i, max_deps))
+        deps_dict[cls] = set(rng.sample(classes[:i], count))
+
+    # Shuffle so that the classes aren't already in order
+    items = list(deps_dict.items())
+    rng.shuffle(items)
+    return dict(items)
+
+
+def bench_toposort(sizes=(10, 100, 1000, 10_000), runs: int = 5):
+    """Time auto_load.toposort on synthetic class graphs of increasing size"""
+    for size in sizes:
+        deps_dict = create_class_graph(size)
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            auto_load.toposort(deps_dict)
+            timings.append(time.perf_counter() - start)
+        print_timings(f"Toposort {size} classes", timings)
+
+
+# DATA PATHS
+
+
+def resolve_path_by_splitting(data, path: str):
+    """The way BPropertyGroupBase.parent used to resolve paths, parsing the path every time"""
+    for part in path.split("."):
+        if "[" in part:
+            subparts = part.split("[")
+            index = subparts[1][:-1]
+            if index.replace("-", "").isdigit():
+                index = int(index)
+            elif index.startswith("\"") or index.startswith("'"):
+                index = index[1:-1]
+            data = getattr(data, subparts[0])[index]
+            continue
+        data = getattr(data, part)
+    return data
+
+
+def create_nested_data(depth: int, indexed: bool, size: int = 10):
+    """Create nested python objects imitating nested property groups, and return the root and a path to the leaf.
+    If indexed is True, each level is an item in a collection, otherwise it is a pointer property."""
+    leaf = root = SimpleNamespace()
+    parts = []
+    for i in range(depth):
+        child = SimpleNamespace()
+        if indexed:
+            leaf.items = [SimpleNamespace() for _ in range(size)] + [child]
+            parts.append(f"items[{size}]")
+        else:
+            leaf.settings = child
+            parts.append("settings")
+        leaf = child
+    return root, ".".join(parts)
+
+
+def bench_data_paths(depths=(2, 8, 32), runs: int = 5, iterations: int = 10_000):
+    """Compare resolving deep and indexed data paths by parsing them each time,
+    with splitting them and using a compiled template."""
+    for indexed in (False, True):
+        for depth in depths:
+            root, path = create_nested_data(depth, indexed)
+            name = f"{'Indexed' if indexed else 'Deep'} path, depth {depth}"
+
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    resolve_path_by_splitting(root, path)
+                timings.append(time.perf_counter() - start)
+            print_timings(f"{name}, parsed ({iterations} times)", timings)
+
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    template, keys = split_data_path(path)
+                    compile_path_template(template)(root, keys)
+                timings.append(time.perf_counter() - start)
+            print_timings(f"{name}, compiled ({iterations} times)", timings)
+
+
+# COPYING SETTINGS
+
+
+def copy_settings_per_item(self, other, recursive=False):
+    """The way BPropertyGroupBase.copy_settings_to used to copy settings, one attribute at a time"""
+    for name in self.keys():
+        attr = getattr(self, name)
+        if issubclass(type(attr), bpy_prop_collection):
+            if not recursive:
+                continue
+            other_collection = getattr(other, name)
+            for item in attr:
+                other_item = other_collection.add()
+                copy_settings_per_item(item, other_item, recursive=recursive)
+            continue
+        try:
+            setattr(other, name, getattr(self, name))
+        except AttributeError as e:
+            print(e)
+
+
+class SD_BenchItem(PropertyGroup):
+    __no_reg__ = True
+
+    value: IntProperty()
+    visible: BoolProperty()
+    location: FloatVectorProperty(size=3)
+
+
+class SD_BenchSettings(PropertyGroup):
+    __no_reg__ = True
+
+    label: StringProperty()
+    items: CollectionProperty(type=SD_BenchItem)
+
+
+def bench_copy_settings(size: int = 10_000, runs: int = 3):
+    """Compare copying settings groups with large collections one attribute at a time, and in bulk.
+    Temporary property groups are registered on the window manager, and removed afterwards."""
+    bpy.utils.register_class(SD_BenchItem)
+    bpy.utils.register_class(SD_BenchSettings)
+    wm_type = bpy.types.WindowManager
+    wm_type.sd_bench_source = bpy.props.PointerProperty(type=SD_BenchSettings)
+    wm_type.sd_bench_target = bpy.props.PointerProperty(type=SD_BenchSettings)
+    try:
+        wm = bpy.context.window_manager
+        source = wm.sd_bench_source
+        source.label = "Benchmark"
+        for i in range(size):
+            item = source.items.add()
+            item.value = i
+            item.visible = bool(i % 2)
+            item.location = (i, i * 2, i * 3)
+
+        for name, copy in (("per item", copy_settings_per_item), ("bulk", BPropertyGroupBase.copy_settings_to)):
+            timings = []
+            for _ in range(runs):
+                wm.sd_bench_target.items.clear()
+                start = time.perf_counter()
+                copy(source, wm.sd_bench_target, recursive=True)
+                timings.append(time.perf_counter() - start)
+            print_timings(f"Copy {size} items {name}", timings)
+            assert wm.sd_bench_target.items[-1].location[2] == (size - 1) * 3
+    finally:
+        del wm_type.sd_bench_source
+        del wm_type.sd_bench_target
+        bpy.utils.unregister_class(SD_BenchSettings)
+        bpy.utils.unregister_class(SD_BenchItem)
+
+
+# DRAWING
+
+
+def create_primitives(count: int, seed: int = 0) -> list[tuple[Line | Rectangle, tuple, bool]]:
+    """Create a random mix of lines, filled rectangles and outlined rectangles, with random colors"""
+    rng = random.Random(seed)
+    primitives = []
+    for i in range(count):
+        x, y = rng.uniform(0, 1000), rng.uniform(0, 1000)
+        color = (rng.random(), rng.random(), rng.random(), 1)
+        kind = i % 3
+        if kind == 0:
+            primitives.append((Line((x, y), (x + 20, y + 5)), color, False))
+        else:
+            primitives.append((Rectangle((x, y), (x + 20, y + 10)), color, kind == 2))
+    return primitives
+
+
+def build_individual_batches(primitives: list) -> list[tuple[str, dict, list | None]]:
+    """Build the vertex data the same way as calling draw_line and draw_rectangle for each primitive"""
+    contents = []
+    for shape, _, lines in primitives:
+        if isinstance(shape, Line):
+            contents.append(("LINES", {"pos": list(shape)}, None))
+        elif lines:
+            contents.append(("LINES", {"pos": shape.coords}, [(0, 1), (1, 2), (2, 3), (3, 0)]))
+        else:
+            contents.append(("TRIS", {"pos": shape.coords}, shape.indices))
+    return contents
+
+
+def build_draw_list(primitives: list) -> list[tuple[str, float, dict]]:
+    draw_list = DrawList()
+    for shape, color, lines in primitives:
+        if isinstance(shape, Line):
+            draw_list.add_line(shape, color)
+        else:
+            draw_list.add_rectangle(shape, color, lines=lines)
+    return draw_list.get_batch_contents()
+
+
+def bench_draw_list(count: int = 10_000, runs: int = 10):
+    """Compare building the vertex data for many lines and rectangles as separate batches, and with a DrawList.
+    This only measures the CPU side, the draw list also saves a draw call for every primitive."""
+    primitives = create_primitives(count)
+    for name, build in (("individual batches", build_individual_batches), ("draw list", build_draw_list)):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            contents = build(primitives)
+            timings.append(time.perf_counter() - start)
+        print_timings(f"Build {count} primitives as {name} ({len(contents)} batches)", timings)
+
+
+# TEXT
+
+
+def wrap_by_measuring_lines(text: str, width: float, size: float) -> list[str]:
+    """The previous implementation of wrap_text, which measures the whole line again for every word"""
+    blf.size(0, size)
+    lines = []
+    line = ""
+    for word in text.split():
+        word = f" {word}"
+        if blf.dimensions(0, line + word)[0] <= width:
+            line += word
+        else:
+            lines.append(line)
+            line = word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def bench_wrap_text(words: int = 2000, width: float = 300, runs: int = 10):
+    """Compare wrapping a long text by measuring each line, with the cached word widths, and with a memoized result"""
+    rng = random.Random(0)
+    text = " ".join("".join(rng.choices("abcdefghij", k=rng.randint(2, 10))) for _ in range(words))
+
+    def cold():
+        text_metrics.clear()
+        return wrap_lines(text, width, 11)
+
+    def warm():
+        # Measure the word widths, but don't reuse the wrapped lines
+        wrap_lines.cache_clear()
+        return wrap_lines(text, width, 11)
+
+    for name, wrap in (
+        ("measuring lines", lambda: wrap_by_measuring_lines(text, width, 11)),
+        ("word widths (cold)", cold),
+        ("word widths (warm)", warm),
+        ("memoized", lambda: wrap_lines(text, width, 11)),
+    ):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            lines = wrap()
+            timings.append(time.perf_counter() - start)
+        print_timings(f"Wrap {words} words by {name} ({len(lines)} lines)", timings)
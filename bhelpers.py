@@ -1,6 +1,9 @@
-from typing import TYPE_CHECKING, Any, Iterator, MutableMapping, TypeVar
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Generic, Iterator, MutableMapping, TypeVar
 
-from bpy.types import NodeTree, NodeTreeInterfacePanel, NodeTreeInterfaceSocket
+from bpy.types import ID, Node, NodeSocket, NodeTree, NodeTreeInterfacePanel, NodeTreeInterfaceSocket
+
+from . import change_tracker
 
 _KT = TypeVar("_KT")
 _VT = TypeVar("_VT")
@@ -57,3 +60,71 @@ class BNodeTree(NodeTree if TYPE_CHECKING else object):
     @property
     def outputs(self) -> BDict[str, NodeTreeInterfaceSocket]:
         return BDict({s.identifier: s for s in self.sockets if s.in_out == "OUTPUT"})
+
+
+class DataCache(Generic[_VT]):
+    """An LRU cache of values derived from blender data, that can be kept between redraws and operator calls.
+    Python references to blender data become invalid after undo, redo or loading a file, so rather than the data itself,
+    entries are keyed by session_uid, plus node names and socket identifiers.
+    Entries are recomputed lazily when their data block has changed, and the whole cache is cleared after undo, redo
+    or loading a file, as recorded by the change tracker.
+    ```
+    links_cache = DataCache(max_size=64)
+    links = links_cache.get(node, socket, compute=lambda: find_links(socket))
+    ```"""
+
+    def __init__(self, max_size: int = 256, track_changes: bool = True):
+        self.max_size = max_size
+        self.track_changes = track_changes
+        "Recompute entries when their data block changes, rather than only after undo, redo and loading"
+        self.entries: OrderedDict[tuple, tuple[int, int, _VT]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._reset_version = change_tracker.reset_version
+
+    @staticmethod
+    def get_key(*data: ID | Node | NodeSocket | NodeTreeInterfaceSocket | str | int) -> tuple:
+        """Get a key that stays the same after undo, e.g. (tree session_uid, node name, socket identifier, is_output)"""
+        key = []
+        for item in data:
+            if isinstance(item, ID):
+                key.append(item.session_uid)
+            elif isinstance(item, NodeSocket):
+                key.extend((item.id_data.session_uid, item.node.name, item.identifier, item.is_output))
+            elif isinstance(item, (Node, NodeTreeInterfaceSocket)):
+                key.extend((item.id_data.session_uid, getattr(item, "identifier", None) or item.name))
+            else:
+                key.append(item)
+        return tuple(key)
+
+    def get(self, *data: ID | Node | NodeSocket | NodeTreeInterfaceSocket | str | int, compute: Callable[[], _VT]) -> _VT:
+        """Get the value for the given data, calling compute to get it if it isn't cached or is out of date"""
+        if self._reset_version != change_tracker.reset_version:
+            self.clear()
+
+        key = self.get_key(*data)
+        if entry := self.entries.get(key):
+            session_uid, version, value = entry
+            if not self.track_changes or change_tracker.id_versions.get(session_uid, 0) <= version:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        self.misses += 1
+        value = compute()
+        # The first item of the key is always the session_uid of the data block that the value depends on
+        self.entries[key] = (key[0], change_tracker.version, value)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return value
+
+    def remove(self, *data: ID | Node | NodeSocket | NodeTreeInterfaceSocket | str | int):
+        self.entries.pop(self.get_key(*data), None)
+
+    def clear(self):
+        self.entries.clear()
+        self._reset_version = change_tracker.reset_version
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -1,12 +1,22 @@
 import inspect
+import os
+import queue
+import re
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
 from enum import Enum
-from functools import wraps
-from typing import TYPE_CHECKING, Any, Callable, Literal, TypeVar, Union
+from functools import lru_cache, wraps
+from typing import TYPE_CHECKING, Any, Callable, Generator, Iterable, Literal, TypeVar, Union, get_args, get_origin
 
+import _bpy
 import bpy
+import numpy as np
 from bpy.props import (
     BoolProperty,
+    CollectionProperty,
     FloatProperty,
     FloatVectorProperty,
     IntProperty,
@@ -16,13 +26,17 @@ from bpy.props import (
 from bpy.types import (
     ID,
     Area,
+    Collection,
     Context,
     Event,
+    Image,
     Material,
     Menu,
+    Mesh,
     NodeTree,
     Object,
     Operator,
+    OperatorFileListElement,
     Panel,
     PropertyGroup,
     UILayout,
@@ -30,6 +44,9 @@ from bpy.types import (
 )
 from mathutils import Vector
 
+from . import change_tracker
+from .handlers import AppTimer
+
 """A module containing helpers to make defining blender types easier (panels, operators etc.)"""
 
 __all__ = [
@@ -139,6 +156,96 @@ def _unwrap_method(func: classmethod):
     return func.__func__ if hasattr(func, "__func__") else func
 
 
+def _as_pointer(value) -> int:
+    return value.as_pointer() if value is not None else 0
+
+
+# Caches of values derived from blender data, which are cleared whenever that data could have changed:
+# When the change tracker records a change (depsgraph updates, undo, redo and loading), and after each BOperator is run.
+data_caches: list[dict] = []
+# While this is above zero an operator is running, and could be modifying the data, so the caches aren't used.
+_data_cache_locks = 0
+# The change tracker version that the caches were last valid for
+_data_cache_version = 0
+
+
+def clear_data_caches(*args):
+    """Clear all caches of blender data.
+    This needs to be called after adding or removing collection items outside of an operator, e.g. in a timer."""
+    global _data_cache_version
+    _data_cache_version = change_tracker.version
+    for cache in data_caches:
+        cache.clear()
+
+
+def use_data_caches() -> bool:
+    """Whether the data caches can be used, clearing them first if anything has changed since they were filled"""
+    if _data_cache_locks:
+        return False
+    if _data_cache_version != change_tracker.version:
+        clear_data_caches()
+    return True
+
+
+@contextmanager
+def modifies_data():
+    """Disable the data caches while the code inside this context manager is running, and clear them afterwards"""
+    global _data_cache_locks
+    _data_cache_locks += 1
+    try:
+        yield
+    finally:
+        _data_cache_locks -= 1
+        clear_data_caches()
+
+
+class PollCache:
+    """Stores the results of poll functions, so that they aren't re-evaluated every time the UI is redrawn.
+    Results are keyed on the area, space, active node tree, active node and the button under the cursor,
+    and are cleared along with the other data caches.
+
+    This is only used for poll functions that opt in to it with `BPoll.cached` or `@BOperator(cache_poll=True)`,
+    as polls that depend on anything else (e.g. the selection) could return outdated results."""
+
+    results: dict[tuple, Any] = {}
+    max_size = 2048
+
+    @staticmethod
+    def get_context_key(context: Context) -> tuple:
+        space = context.space_data
+        tree = getattr(space, "edit_tree", None)
+        node = tree.nodes.active if tree else None
+        return (
+            _as_pointer(context.area),
+            _as_pointer(space),
+            _as_pointer(tree),
+            _as_pointer(node),
+            _as_pointer(getattr(context, "button_pointer", None)),
+        )
+
+    @classmethod
+    def get(cls, owner, func: Callable[[Context], Any], context: Context):
+        """Get the cached result of the poll function, or call it if there isn't one.
+        owner: A hashable value that identifies the poll function"""
+        if not use_data_caches():
+            return func(context)
+
+        key = (owner, *cls.get_context_key(context))
+        try:
+            return cls.results[key]
+        except KeyError:
+            pass
+
+        result = func(context)
+        if len(cls.results) >= cls.max_size:
+            cls.results.clear()
+        cls.results[key] = result
+        return result
+
+
+data_caches.append(PollCache.results)
+
+
 class BPoll:
     """Presets for common poll functions
     All functions starting with `poll_` are poll functions.
@@ -187,6 +294,12 @@ class BPoll:
         """Return if both poll functions are False. Equivalent to `not f1 and not f2`"""
         return classmethod(lambda cls, context: not f1(cls, context) and not f2(cls, context))
 
+    @_unwrap_classmethod_args
+    def cached(f: Callable) -> classmethod:
+        """Memoize the result of the provided poll function, see `PollCache` for when results are invalidated.
+        Only use this for poll functions that depend on the active area, space, node tree, node or button."""
+        return classmethod(lambda cls, context: PollCache.get((f, cls), lambda context: f(cls, context), context))
+
     @classmethod
     def poll_file_saved(cls, context: Context) -> bool:
         return bpy.data.is_saved
@@ -216,6 +329,16 @@ class BPoll:
         if BPoll.poll_node_editor(context) and context.space_data.node_tree:
             return context.space_data.node_tree
 
+    @classmethod
+    def poll_active_node_group(cls, context: Context) -> NodeTree:
+        """Return the node tree being edited if it is a node group, rather than a material, world or compositor tree"""
+        if not BPoll.poll_node_editor(context):
+            return None
+        tree = context.space_data.edit_tree
+        # Trees that aren't node groups are embedded in another data block, so this avoids searching bpy.data
+        if tree and not tree.is_embedded_data:
+            return tree
+
 
 # TYPES
 @dataclass
@@ -422,47 +545,139 @@ class BPanel:
 PropertyGroupClass = TypeVar("PropertyGroupClass", bound=PropertyGroup)
 
 
+# Matches the collection keys in a data path, e.g. [0] or ["name"]
+_path_key_re = re.compile(r'\[(-?\d+|"(?:[^"\\]|\\.)*")\]')
+_path_escape_re = re.compile(r"\\(.)")
+
+
+@lru_cache(maxsize=4096)
+def split_data_path(path: str) -> tuple[str, tuple]:
+    """Split a data path into a template with the collection keys removed, and the keys themselves, so that
+    paths to different items of the same collection share a template, e.g.:
+    `items[2].settings["a"]` -> `("items[].settings[]", (2, "a"))`"""
+    # This alternates between the parts of the template and the keys
+    parts = _path_key_re.split(path)
+    keys = tuple(int(key) if key[0] != '"' else _path_escape_re.sub(r"\1", key[1:-1]) for key in parts[1::2])
+    return "[]".join(parts[::2]), keys
+
+
+@lru_cache(maxsize=1024)
+def compile_path_template(template: str) -> Callable[[Any, tuple], Any]:
+    """Compile a template from `split_data_path` into a function that takes the data to start from and the
+    collection keys, and returns the data at the end of the path.
+    e.g. `items[].settings` becomes `lambda data, keys: data.items[keys[0]].settings`"""
+    expression = "data"
+    key_index = 0
+    for part in template.split(".") if template else ():
+        name = part.replace("[]", "")
+        if not name.isidentifier():
+            raise ValueError(f"Invalid data path: {template}")
+        expression += f".{name}"
+        for _ in range(part.count("[]")):
+            expression += f"[keys[{key_index}]]"
+            key_index += 1
+    return eval(f"lambda data, keys: {expression}")
+
+
 class BPropertyGroupBase(PropertyGroup):
+    # The parents of property groups, keyed by the pointers of the property group and its ID.
+    _parent_cache: dict[tuple[int, int], Any] = {}
+    _max_parent_cache_size = 4096
 
     @property
     def parent(self):
         """Get the parent instance of this property group"""
-        parts = self.path_from_id().split(".")[:-1]
-        parent = self.id_data
-        for part in parts:
-            # Special case for collections that require indices to access
-            if "[" in part:
-                subparts = part.split("[")
-                index = subparts[1][:-1]
-                if index.replace("-", "").isdigit():
-                    index = int(index)
-                elif index.startswith("\"") or index.startswith("'"):
-                    index = index[1:-1]
-                parent = getattr(parent, subparts[0])[index]
-                continue
-            parent = getattr(parent, part)
+        id_data = self.id_data
+        key = (self.as_pointer(), id_data.as_pointer())
+        use_cache = use_data_caches()
+        if use_cache and (parent := self._parent_cache.get(key)) is not None:
+            return parent
+
+        template, keys = split_data_path(self.path_from_id())
+        # Remove the last attribute, along with any collection keys that follow it
+        parent_template, _, last = template.rpartition(".")
+        if key_count := last.count("[]"):
+            keys = keys[:-key_count]
+        parent = compile_path_template(parent_template)(id_data, keys)
+
+        if use_cache:
+            if len(self._parent_cache) >= self._max_parent_cache_size:
+                self._parent_cache.clear()
+            self._parent_cache[key] = parent
         return parent
 
-    def copy_settings_to(self, other: PropertyGroup, recursive=False):
-        for name in self.keys():
-            attr = getattr(self, name)
-
-            # Special case for collection properties
-            if issubclass(type(attr), bpy_prop_collection):
-                if not recursive:
+    def copy_settings_to(self, other: PropertyGroup, recursive=False) -> list[Exception]:
+        """Copy the properties that have been set on this property group to another one of the same type.
+        If recursive is True, nested property groups are copied too, and the items of collection properties are
+        added to the other group's collections, with their numeric properties copied all at once.
+        Returns the errors raised while copying properties, rather than stopping at the first one."""
+        errors = []
+        # Pairs of property groups to copy between, along with the names of properties that have already been copied
+        to_copy: list[tuple[PropertyGroup, PropertyGroup, set[str]]] = [(self, other, set())]
+        while to_copy:
+            source, target, skip = to_copy.pop()
+            for name in source.keys():
+                if name in skip:
                     continue
-                other_collection = getattr(other, name)
-                for item in attr:
-                    other_item = other_collection.add()
-                    BPropertyGroupBase.copy_settings_to(item, other_item, recursive=recursive)
-                continue
-
-            # Copy attribute
-            try:
-                setattr(other, name, getattr(self, name))
-            except AttributeError as e:
-                print(e)
-                pass
+                try:
+                    attr = getattr(source, name)
+
+                    # Special case for collection properties
+                    if isinstance(attr, bpy_prop_collection):
+                        if recursive:
+                            item_type = source.bl_rna.properties[name].fixed_type
+                            to_copy.extend(_bulk_copy_collection(attr, getattr(target, name), item_type))
+                        continue
+
+                    if isinstance(attr, PropertyGroup):
+                        if recursive:
+                            to_copy.append((attr, getattr(target, name), set()))
+                        continue
+
+                    # Copy attribute
+                    setattr(target, name, attr)
+                except (AttributeError, TypeError, ValueError) as e:
+                    errors.append(e)
+        return errors
+
+
+# The types of properties that can be copied with foreach_get/foreach_set, and the numpy types used to store them
+_bulk_property_dtypes = {"FLOAT": np.float32, "INT": np.int32, "BOOLEAN": bool}
+
+
+def _bulk_copy_collection(source: bpy_prop_collection, target: bpy_prop_collection, item_type) -> list[tuple]:
+    """Add copies of the items in one collection property to the end of another one.
+    Numeric properties are copied for all items at once, and the pairs of items that still need their other
+    properties to be copied are returned, along with the names of the properties that have already been copied."""
+    offset = len(target)
+    count = len(source)
+    if not count:
+        return []
+    for _ in range(count):
+        target.add()
+
+    copied = set()
+    needs_item_copy = False
+    for prop in item_type.properties:
+        name = prop.identifier
+        if name == "rna_type":
+            continue
+        dtype = _bulk_property_dtypes.get(prop.type)
+        if not dtype or prop.is_readonly:
+            needs_item_copy = True
+            continue
+        size = max(prop.array_length, 1)
+        values = np.empty((offset + count) * size, dtype=dtype)
+        if offset:
+            # Keep the values of the existing items
+            target.foreach_get(name, values)
+        source.foreach_get(name, values[offset * size :])
+        target.foreach_set(name, values)
+        copied.add(name)
+
+    if not needs_item_copy:
+        return []
+    return [(item, target[offset + i], copied) for i, item in enumerate(source)]
 
 
 class BPropertyGroup:
@@ -496,6 +711,7 @@ class BPropertyGroup:
 
 
 property_groups: list[BPropertyGroup] = []
+data_caches.append(BPropertyGroupBase._parent_cache)
 
 
 @dataclass
@@ -522,6 +738,76 @@ def CustomProperty(type: T, description: str) -> T:
 OperatorClass = TypeVar("OperatorClass", bound=Operator)
 
 
+class Job:
+    """The state of a job started by a job operator, shared with the worker thread that runs it"""
+
+    def __init__(self):
+        self.progress: float = 0
+        "Can be set by the work function to show the progress, from 0 to 1"
+        self.cancelled = False
+        "Set when the job is cancelled. Work functions that take a long time should check this and return early."
+        self.done = False
+        self.result: Any = None
+        self.error: Exception | None = None
+        self.future: Future | None = None
+
+    def cancel(self):
+        self.cancelled = True
+        if self.future:
+            self.future.cancel()
+        running_jobs.pop(self, None)
+
+
+# Shared by all job operators, and created when the first job is started
+job_executor: ThreadPoolExecutor | None = None
+# Worker threads put the results of jobs in this, which is emptied on the main thread by a timer
+job_results: queue.SimpleQueue[tuple[Job, Any, Exception | None]] = queue.SimpleQueue()
+running_jobs: dict[Job, None] = {}
+_job_timer: AppTimer | None = None
+
+
+def submit_job(job: Job, func: Callable, *args):
+    """Call a function in a worker thread, and deliver its result to the job on the main thread"""
+    global job_executor, _job_timer
+
+    def run():
+        try:
+            job_results.put((job, func(*args), None))
+        except Exception as e:
+            traceback.print_exc()
+            job_results.put((job, None, e))
+
+    if not job_executor:
+        job_executor = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="sd_tools_job")
+    running_jobs[job] = None
+    job.future = job_executor.submit(run)
+    if not _job_timer or _job_timer.finished:
+        _job_timer = AppTimer(deliver_job_results, first_interval=0.05)
+
+
+def deliver_job_results():
+    while True:
+        try:
+            job, result, error = job_results.get_nowait()
+        except queue.Empty:
+            break
+        running_jobs.pop(job, None)
+        if not job.cancelled:
+            job.result, job.error = result, error
+            job.done = True
+    return 0.05 if running_jobs else None
+
+
+def cancel_jobs():
+    """Cancel all running jobs, and shut down the worker threads without waiting for them"""
+    global job_executor
+    for job in list(running_jobs):
+        job.cancel()
+    if job_executor:
+        job_executor.shutdown(wait=False, cancel_futures=True)
+        job_executor = None
+
+
 class BOperatorBase(Operator):
     """The base operator class used by the @BOperator decorator."""
 
@@ -544,6 +830,17 @@ class BOperatorBase(Operator):
 
     custom_args: dict
     _has_set_custom_args: bool = False
+    _cache_poll: bool = False
+
+    # The state of a task started with start_task
+    _task: Generator | None = None
+    _task_state: str = ""
+    _task_error: str = ""
+    _progress: float = 0
+
+    # Whether this is a job operator, and the state of the running job
+    _job_mode: bool = False
+    _job: Job | None = None
 
     @classmethod
     def register(cls):
@@ -558,22 +855,39 @@ class BOperatorBase(Operator):
         if hasattr(super(), "register"):
             super().register()
 
+    @classmethod
+    def get_op(cls):
+        """Get the bpy.ops function for this operator.
+        It is only looked up the first time, and then cached on the class."""
+        # Check the class dict so that subclasses don't use the function of their parent
+        op = cls.__dict__.get("_op")
+        if op is None:
+            op = bpy.ops
+            for part in cls.bl_idname.split("."):
+                op = getattr(op, part)
+            cls._op = op
+        return op
+
+    @classmethod
+    def _set_custom_args_from_kwargs(cls, kwargs: dict) -> dict:
+        """Set any custom arguments on the class, and return the remaining keyword arguments"""
+        if not kwargs:
+            return kwargs
+        custom_args = getattr(cls, "custom_args", {})
+        for name, value in kwargs.copy().items():
+            if name in custom_args:
+                setattr(cls, name, value)
+                del kwargs[name]
+        return kwargs
+
     @classmethod
     def run(cls, exec_context: ExecContext = None, **kwargs) -> set[str]:
         """Run this operator with the given execution context.
         An extra feature is that you can pass arguments of custom types (not just built in blender ones).
         They need to be defined in the same way as normal arguments on the class (e.g. my_prop: BoolProperty()),
         but using the CustomProperty() function instead."""
-
-        # Get operator function
-        op = bpy.ops
-        for part in cls.bl_idname.split("."):
-            op = getattr(op, part)
-
-        for name, value in kwargs.copy().items():
-            if name in cls.custom_args:
-                setattr(cls, name, value)
-                del kwargs[name]
+        op = cls.get_op()
+        kwargs = cls._set_custom_args_from_kwargs(kwargs)
 
         # Execute
         if exec_context:
@@ -581,6 +895,41 @@ class BOperatorBase(Operator):
         else:
             return op(**kwargs)
 
+    @classmethod
+    def run_many(
+        cls,
+        kwargs_list: Iterable[dict],
+        exec_context: ExecContext = ExecContext.EXEC,
+        undo_message: str = "",
+    ) -> list[set[str]]:
+        """Run this operator once for each dictionary of keyword arguments, in the same way as BOperator.run().
+        All of the calls are combined into a single undo step, and the view layer is only updated and the UI redrawn
+        once at the end, rather than after each call.
+        Because of that, each call won't see the evaluated (depsgraph) results of the previous ones.
+
+        undo_message: The name of the undo step, the operator label by default."""
+        context = bpy.context
+        idname = cls.get_op().idname_py()
+
+        results = []
+        for kwargs in kwargs_list:
+            kwargs = cls._set_custom_args_from_kwargs(dict(kwargs))
+            # Call the operator directly rather than through bpy.ops, which updates the view layer before and after.
+            # Passing False prevents each call from pushing its own undo step.
+            results.append(_bpy.ops.call(idname, kwargs, exec_context, False))
+
+        if not any("FINISHED" in result for result in results):
+            return results
+
+        if context.view_layer:
+            context.view_layer.update()
+        if "UNDO" in cls.bl_options:
+            bpy.ops.ed.undo_push(message=undo_message or cls.bl_label)
+        for window in context.window_manager.windows:
+            for area in window.screen.areas:
+                area.tag_redraw()
+        return results
+
     @classmethod
     def draw_button(
         cls: OperatorClass,
@@ -636,6 +985,143 @@ class BOperatorBase(Operator):
         bpy.context.window_manager.modal_handler_add(self)
         return self.RUNNING_MODAL
 
+    def start_task(self, context: Context, task: Generator[float | None, None, None], budget: float = 0.01):
+        """Run a generator over multiple frames, so that long operations don't freeze the UI.
+        The generator should yield after each unit of work, optionally yielding the progress between 0 and 1.
+        Each tick of the scheduler runs as much of it as fits within the budget (in seconds).
+
+        Progress is shown in the status bar, and pressing ESC cancels the task, keeping the work done so far.
+        If the operator has the UNDO option, all of the changes are combined into a single undo step.
+        Should be called and returned by the invoke function, in place of start_modal.
+        Execute should use run_task instead, as it is also called by scripts and by redo, which expect it to be done
+        by the time it returns."""
+        if not context.window:
+            # There's no UI to keep responsive (e.g. in background mode), so just run it now
+            return self.run_task(task)
+
+        self._task = task
+        self._task_state = "RUNNING"
+        self._task_budget = budget
+        self._begin_progress(context)
+        self._task_timer = AppTimer(self._step_task)
+        return self.start_modal()
+
+    def run_task(self, task: Generator[float | None, None, None]):
+        """Run all of a task generator immediately"""
+        for _ in task:
+            pass
+        return self.FINISHED
+
+    def _step_task(self):
+        if self._task_state != "RUNNING":
+            return None
+
+        end = time.perf_counter() + self._task_budget
+        try:
+            with modifies_data():
+                while time.perf_counter() < end:
+                    progress = next(self._task)
+                    if progress is not None:
+                        self._progress = progress
+        except StopIteration:
+            self._task_state = "FINISHED"
+            return None
+        except Exception as e:
+            traceback.print_exc()
+            self._task_error = str(e)
+            self._task_state = "ERROR"
+            return None
+
+        self._update_progress()
+        return 0
+
+    def _end_task(self):
+        self._task_timer.remove()
+        self._task.close()
+        self._end_progress()
+        self._task = None
+
+    def _modal_task(self, context: Context, event: Event):
+        if self._task_state == "RUNNING":
+            if event.type == "ESC" and event.value == "PRESS":
+                self._task_state = "CANCELLED"
+            else:
+                return self.PASS_THROUGH
+
+        self._end_task()
+        if self._task_state == "ERROR":
+            self.report({"ERROR"}, f"{self.bl_label} failed: {self._task_error}")
+            return self.CANCELLED
+        if self._task_state == "CANCELLED":
+            self.report({"INFO"}, f"{self.bl_label} cancelled at {self._progress:.0%}")
+        # Finish even when cancelled, so that the work that has been done is added to the undo history
+        return self.FINISHED
+
+    def _start_job(self, context: Context, threaded: bool = True):
+        """Run the work function of a job operator in a worker thread, see `@BOperator(job=True)`.
+        If threaded is False, or there's no UI to keep responsive (e.g. in background mode), it is run immediately."""
+        data = self.prepare(context) if hasattr(self, "prepare") else None
+        # The data could be anything, including numpy arrays which can't be compared with a set
+        if isinstance(data, set) and data == self.CANCELLED:
+            return self.CANCELLED
+
+        job = Job()
+        if not threaded or not context.window:
+            with modifies_data():
+                ret = self.apply(context, self.work(data, job))
+            return ret or self.FINISHED
+
+        self._job = job
+        submit_job(job, self.work, data, job)
+        self._begin_progress(context)
+        return self.start_modal()
+
+    def _end_job(self):
+        self._end_progress()
+        self._job = None
+
+    def _modal_job(self, context: Context, event: Event):
+        job = self._job
+        if event.type == "ESC" and event.value == "PRESS":
+            job.cancel()
+            self._end_job()
+            self.report({"INFO"}, f"{self.bl_label} cancelled")
+            return self.CANCELLED
+
+        if not job.done:
+            if event.type == "TIMER":
+                self._progress = job.progress
+                self._update_progress()
+            return self.PASS_THROUGH
+
+        self._end_job()
+        if job.error:
+            self.report({"ERROR"}, f"{self.bl_label} failed: {job.error}")
+            return self.CANCELLED
+        with modifies_data():
+            ret = self.apply(context, job.result)
+        return self.FINISHED if ret is None else ret
+
+    def _begin_progress(self, context: Context):
+        """Show the progress of a task or job, and make sure that modal is called regularly,
+        so that the operator can finish without waiting for an event"""
+        self._progress = 0
+        self._progress_wm = context.window_manager
+        self._progress_workspace = context.workspace
+        self._progress_wm.progress_begin(0, 1)
+        self._progress_event_timer = self._progress_wm.event_timer_add(0.1, window=context.window)
+
+    def _update_progress(self):
+        self._progress_wm.progress_update(self._progress)
+        if self._progress_workspace:
+            self._progress_workspace.status_text_set(f"{self.bl_label}: {self._progress:.0%} (Press Esc to cancel)")
+
+    def _end_progress(self):
+        self._progress_wm.event_timer_remove(self._progress_event_timer)
+        self._progress_wm.progress_end()
+        if self._progress_workspace:
+            self._progress_workspace.status_text_set(None)
+
     def set_event_attrs(self, event):
         """Set the `event, mouse_window, mouse_window_prev` and `mouse_region` attributes on the class"""
         self.event = event
@@ -658,12 +1144,18 @@ class BOperatorBase(Operator):
     def poll(cls, context: Context):
         """Wrap the poll function to automate the setting of poll messages."""
         if hasattr(super(), "poll"):
-            retval = super().poll(context)
+            if cls._cache_poll:
+                retval = PollCache.get(cls, super().poll, context)
+            else:
+                retval = super().poll(context)
             if not retval and cls.poll_message:
                 # This should be a function so as to avoid unnecessary evaluation,
                 # But also because it being a string causes the Blender VSCode extension
                 # to freeze up, for some extremely clear reason.
-                cls.poll_message_set(lambda: cls.poll_message)
+                # It's only created once per class, as poll can be called many times per redraw.
+                if "_get_poll_message" not in cls.__dict__:
+                    cls._get_poll_message = lambda: cls.poll_message
+                cls.poll_message_set(cls._get_poll_message)
             return retval
         return True
 
@@ -672,10 +1164,14 @@ class BOperatorBase(Operator):
         self._set_custom_args()
 
         self.set_event_attrs(event)
-        if hasattr(super(), "invoke"):
-            return super().invoke(context, event)
-        else:
-            return self.execute(context)
+        if self._job_mode and not hasattr(super(), "invoke"):
+            # Jobs only run in a worker thread when started from the UI
+            return self._start_job(context)
+        with modifies_data():
+            if hasattr(super(), "invoke"):
+                return super().invoke(context, event)
+            else:
+                return self.execute(context)
 
     def draw(self, context: Context):
         """Wrap the draw function to add a default layout"""
@@ -687,14 +1183,34 @@ class BOperatorBase(Operator):
     def modal(self, context: Context, event: Event):
         """Wrap the modal function so we can set some initial attributes"""
         self.set_event_attrs(event)
-        return super().modal(context, event)
+        if self._task is not None:
+            return self._modal_task(context, event)
+        if self._job is not None:
+            return self._modal_job(context, event)
+        with modifies_data():
+            return super().modal(context, event)
+
+    def cancel(self, context: Context):
+        """Wrap the cancel function to stop any running task or job when the operator is cancelled by Blender"""
+        if self._task is not None:
+            self._end_task()
+        if self._job is not None:
+            self._job.cancel()
+            self._end_job()
+        if hasattr(super(), "cancel"):
+            return super().cancel(context)
 
     def execute(self, context: Context):
         """Wrap the execute function to remove the need to return {"FINISHED"}"""
         self._set_custom_args()
 
+        if self._job_mode:
+            # Scripts and redo call execute directly, and expect it to be finished when it returns
+            return self._start_job(context, threaded=False)
+
         if hasattr(super(), "execute"):
-            ret = super().execute(context)
+            with modifies_data():
+                ret = super().execute(context)
             if ret is None:
                 return self.FINISHED
             return ret
@@ -738,6 +1254,15 @@ class BOperator:
         preset (bool): Display a preset button with the operators settings.
         blocking (bool): Block anything else from using the cursor.
         macro (bool): Use to check if an operator is a macro.
+        cache_poll (bool): Whether to memoize the result of the poll function, see `PollCache`.
+            Only use this if the poll function depends on the active area, space, node tree, node or button.
+        job (bool): Run the operator as a background job. Instead of execute, the class defines:
+            `prepare(self, context)` (optional): Runs on the main thread, and returns the data that work needs.
+            `work(self, data, job: Job)`: Runs in a worker thread, and returns the result.
+                It must not access any blender data, including the operator properties.
+            `apply(self, context, result)`: Runs on the main thread when the work is done.
+            When invoked from the UI, the operator stays modal while the work runs, showing the progress set with
+            `job.progress`, and can be cancelled with ESC. When executed from a script or by redo, it runs immediately.
     """
 
     category: str = ""
@@ -755,6 +1280,8 @@ class BOperator:
     preset: bool = False
     blocking: bool = False
     macro: bool = False
+    cache_poll: bool = False
+    job: bool = False
 
     if TYPE_CHECKING:
         type = BOperatorBase
@@ -779,6 +1306,9 @@ class BOperator:
                 )
             category = Config.addon_string
 
+        if decorator.job and not (hasattr(cls, "work") and hasattr(cls, "apply")):
+            raise ValueError(f"Job operator {cls.__name__} needs to define both work and apply functions")
+
         cls_name_end = cls.__name__.split("OT_")[-1]
         idname = f"{category}." + (decorator.idname or cls_name_end)
         label = decorator.label or cls_name_end.replace("_", " ").title()
@@ -814,6 +1344,8 @@ class BOperator:
             bl_options = options
 
             __no_reg__ = False
+            _cache_poll = decorator.cache_poll
+            _job_mode = decorator.job
 
             # Set up a description that can be set from the UI draw function
             if decorator.dynamic_description:
@@ -832,12 +1364,57 @@ class BOperator:
         return Wrapped
 
 
+# The ID types that can be used as arguments with FunctionToOperator, and the names of their collections in bpy.data
+function_id_types = {
+    Material: "materials",
+    Object: "objects",
+    NodeTree: "node_groups",
+    Collection: "collections",
+    Image: "images",
+    Mesh: "meshes",
+}
+
+
+def _unique_ids(ids: Iterable[ID]) -> list[ID]:
+    return list(dict.fromkeys(id for id in ids if id))
+
+
+# Functions that get the selected data blocks of each ID type, used when FunctionToOperator is vectorized
+selected_id_getters: dict[type, Callable[[Context], list[ID]]] = {
+    Material: lambda context: _unique_ids(obj.active_material for obj in context.selected_objects),
+    Object: lambda context: list(context.selected_objects),
+    NodeTree: lambda context: _unique_ids(getattr(n, "node_tree", None) for n in context.selected_nodes or ()),
+    Collection: lambda context: _unique_ids([context.collection]),
+    Image: lambda context: _unique_ids(getattr(n, "image", None) for n in context.selected_nodes or ()),
+    Mesh: lambda context: _unique_ids(obj.data for obj in context.selected_objects if obj.type == "MESH"),
+}
+
+
+def get_selected_ids(context: Context, id_type: type) -> list[ID]:
+    """Get the selected data blocks of the given type, using the outliner selection if there is one"""
+    if selected_ids := getattr(context, "selected_ids", None):
+        return [id for id in selected_ids if isinstance(id, id_type)]
+    return selected_id_getters[id_type](context)
+
+
+def get_ids_by_name(id_type: type, names: list[str]) -> list[ID]:
+    """Get the data blocks of the given type with the given names, skipping any names that don't exist.
+    The names of the data blocks are indexed once, rather than searching them for each name."""
+    collection: bpy_prop_collection = getattr(bpy.data, function_id_types[id_type])
+    if len(names) == 1:
+        return [id] if (id := collection.get(names[0])) else []
+    # Reversed so that the first data block with each name is used, the same as with collection.get
+    index = dict(zip(reversed(collection.keys()), reversed(collection.values())))
+    return [index[name] for name in names if name in index]
+
+
 @dataclass
 class FunctionToOperator:
     """A decorator that takes a function and registers an operator that will call it in the execute function.
     It automatically converts the arguments of the function to operator arguments for basic data types,
     and for blender id types (e.g. Objects etc.), the operator takes the name and then automatically gets the data
-    block to pass to the wrapped function
+    block to pass to the wrapped function.
+    Lists of ids (e.g. `list[Object]`) take a collection of names, which can be passed as `[{"name": "Cube"}, ...]`.
 
     The idname of the operator is just bpy.ops.{category}.{function_name}
 
@@ -845,20 +1422,19 @@ class FunctionToOperator:
 
     Args:
         category (str): The category that the operator will be placed in.
-        label (str): The label to display in the UI"""
+        label (str): The label to display in the UI
+        vectorize (bool): If no names are given for a list of ids, pass all selected data blocks of that type instead.
+            This allows the function to be called once for the whole selection, rather than once per data block."""
 
     category: str
     label: str = ""
+    vectorize: bool = False
 
     def __call__(self, function):
         parameters = inspect.signature(function).parameters
-        supported_id_types = {
-            Material,
-            Object,
-        }
+        vectorize = self.vectorize
 
         # Convert between python and blender property types
-        # In the future if I need to add more Data blocks, I can, but for now it is just materials and objects.
         prop_types = {
             str: StringProperty,
             bool: BoolProperty,
@@ -867,9 +1443,15 @@ class FunctionToOperator:
             Vector: FloatVectorProperty,
         }
 
-        prop_types.update({id_type: StringProperty for id_type in supported_id_types})
+        prop_types.update({id_type: StringProperty for id_type in function_id_types})
         label = self.label if self.label else function.__name__.replace("_", " ").title()
 
+        # The name of each argument, and the id type if it is an id or a list of ids
+        id_args: dict[str, type] = {}
+        id_list_args: dict[str, type] = {}
+        context_args: list[str] = []
+        value_args: list[str] = []
+
         # Define the new operator
         @BOperator(
             category=self.category,
@@ -880,23 +1462,20 @@ class FunctionToOperator:
         class CustomOperator(BOperator.type):
             def execute(self, context):
                 # Get the operator properties and convert them to function key word arguments
-
-                types_to_data = {
-                    Material: bpy.data.materials,
-                    Object: bpy.data.objects,
-                }
-
-                kwargs = {}
-                for name, param in parameters.items():
-                    # If it is an ID type, convert the name to the actual data block
-                    if param.annotation in supported_id_types:
-                        kwargs[name] = types_to_data[param.annotation].get(getattr(self, name))
-                    # Context is a special case
-                    elif param.annotation == Context:
-                        kwargs[name] = context
-                    # Otherwise just pass the value
+                kwargs = {name: getattr(self, name) for name in value_args}
+                kwargs.update({name: context for name in context_args})
+
+                # If it is an ID type, convert the name to the actual data block
+                for name, id_type in id_args.items():
+                    kwargs[name] = getattr(bpy.data, function_id_types[id_type]).get(getattr(self, name))
+
+                for name, id_type in id_list_args.items():
+                    if names := [item.name for item in getattr(self, name)]:
+                        kwargs[name] = get_ids_by_name(id_type, names)
+                    elif vectorize:
+                        kwargs[name] = get_selected_ids(context, id_type)
                     else:
-                        kwargs[name] = getattr(self, name)
+                        kwargs[name] = []
 
                 # Call the function
                 function(**kwargs)
@@ -904,17 +1483,35 @@ class FunctionToOperator:
 
         # Convert the function arguments into operator properties by adding to the annotations
         for name, param in parameters.items():
-            prop_type = prop_types.get(param.annotation)
+            annotation = param.annotation
+
+            # Context is a special case
+            if annotation == Context:
+                context_args.append(name)
+                continue
+
+            # Lists of ids are stored as a collection of names
+            if get_origin(annotation) is list and get_args(annotation)[0] in function_id_types:
+                id_list_args[name] = get_args(annotation)[0]
+                CustomOperator.__annotations__[name] = CollectionProperty(type=OperatorFileListElement, name=name)
+                continue
+
+            prop_type = prop_types.get(annotation)
 
             # Custom python objects cannot be passed.
-            if not prop_type and param.annotation != Context:
-                raise ValueError(f"Cannot convert function arguments of type {param.annotation} to operator property")
+            if not prop_type:
+                raise ValueError(f"Cannot convert function arguments of type {annotation} to operator property")
+
+            if annotation in function_id_types:
+                id_args[name] = annotation
+            else:
+                value_args.append(name)
 
             # Whether to set a default value or not
             if param.default == inspect._empty:
-                prop = prop_types[param.annotation](name=name)
+                prop = prop_type(name=name)
             else:
-                prop = prop_types[param.annotation](name=name, default=param.default)
+                prop = prop_type(name=name, default=param.default)
 
             # Create the property
             CustomOperator.__annotations__[name] = prop
@@ -934,6 +1531,8 @@ def register():
 
 
 def unregister():
+    clear_data_caches()
+    cancel_jobs()
     for op in to_register:
         bpy.utils.unregister_class(op)
     for pgroup in property_groups:
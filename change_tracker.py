@@ -0,0 +1,133 @@
+import bpy
+from bpy.types import ID
+
+from .handlers import Handler, HandlerType
+
+"""Keeps track of which data blocks have changed, so that caches can check whether they are out of date in O(1),
+rather than scanning bpy.data.
+
+Every time something changes, the version is incremented, and the data blocks that changed, along with their types,
+are given the new version. Caches can store the version when they were created, and then compare it with
+`get_id_version`, `get_type_version` or `has_changed` later.
+For caches that need to know exactly which data blocks changed, `DirtySet` collects their session_uids.
+
+Undo, redo and loading a file can change anything, so they count as a change to every data block."""
+
+# Reloading this would reset the versions, making caches think that nothing has changed
+__no_reload__ = True
+
+
+class IDType:
+    """The most common values of ID.id_type, though any value can be used"""
+
+    NODE_TREE = "NODETREE"
+    MATERIAL = "MATERIAL"
+    OBJECT = "OBJECT"
+    COLLECTION = "COLLECTION"
+
+
+version = 0
+"Incremented every time something changes"
+reset_version = 0
+"The version when everything last changed, after undo, redo or loading a file"
+id_versions: dict[int, int] = {}
+"The version when each data block last changed, keyed by session_uid"
+type_versions: dict[str, int] = {}
+"The version when any data block of each type last changed"
+
+dirty_sets: list["DirtySet"] = []
+_handlers: list[Handler] = []
+
+
+class DirtySet:
+    """Collects the session_uids of the data blocks that have changed, until they are popped.
+    ```
+    dirty = DirtySet(IDType.NODE_TREE)
+    ...
+    changed, everything = dirty.pop()
+    ```"""
+
+    def __init__(self, *id_types: str):
+        self.id_types = set(id_types)
+        "The types of data blocks to collect, or all types if empty"
+        self.ids: set[int] = set()
+        self.everything = False
+        "Set when every data block could have changed, e.g. after undo"
+        dirty_sets.append(self)
+
+    def add(self, session_uid: int, id_type: str):
+        if not self.id_types or id_type in self.id_types:
+            self.ids.add(session_uid)
+
+    def pop(self) -> tuple[set[int], bool]:
+        """Return the session_uids that have changed since the last call, and whether everything has changed"""
+        ids, everything = self.ids, self.everything
+        self.ids = set()
+        self.everything = False
+        return ids, everything
+
+    def remove(self):
+        dirty_sets.remove(self)
+
+
+def get_version() -> int:
+    return version
+
+
+def get_id_version(id: ID) -> int:
+    """Get the version when this data block last changed"""
+    return max(id_versions.get(id.session_uid, 0), reset_version)
+
+
+def get_type_version(id_type: str) -> int:
+    """Get the version when any data block of this type (e.g. IDType.MATERIAL) last changed"""
+    return max(type_versions.get(id_type, 0), reset_version)
+
+
+def has_changed(id_or_type: ID | str, since: int) -> bool:
+    """Check whether a data block, or any data block of a type, has changed since the given version"""
+    if isinstance(id_or_type, str):
+        return get_type_version(id_or_type) > since
+    return get_id_version(id_or_type) > since
+
+
+def mark_changed(ids: list[ID]):
+    """Record that the given data blocks have changed"""
+    global version
+    version += 1
+    for id in ids:
+        id_versions[id.session_uid] = version
+        type_versions[id.id_type] = version
+        for dirty_set in dirty_sets:
+            dirty_set.add(id.session_uid, id.id_type)
+
+
+def mark_everything_changed(*args):
+    """Record that every data block could have changed.
+    This also forgets the versions of individual data blocks, as they may not exist any more."""
+    global version, reset_version
+    version += 1
+    reset_version = version
+    id_versions.clear()
+    type_versions.clear()
+    for dirty_set in dirty_sets:
+        dirty_set.ids.clear()
+        dirty_set.everything = True
+
+
+def on_depsgraph_update(scene, depsgraph: bpy.types.Depsgraph):
+    mark_changed([update.id.original for update in depsgraph.updates])
+
+
+def register():
+    # These run before other handlers, so that they see the new versions
+    _handlers.append(Handler(on_depsgraph_update, HandlerType.DEPSGRAPH_UPDATE_POST, persistent=True, order=-100))
+    for handler_type in (HandlerType.UNDO_POST, HandlerType.REDO_POST, HandlerType.LOAD_POST):
+        _handlers.append(Handler(mark_everything_changed, handler_type, persistent=True, order=-100))
+
+
+def unregister():
+    for handler in _handlers:
+        handler.remove()
+    _handlers.clear()
+    mark_everything_changed()
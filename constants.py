@@ -13,3 +13,5 @@ class Dirs:
 class Files:
     BL_RECENT_FILES = Dirs.CONFIG_DIR / "recent-files.txt"
     RECENT_FILE_LIST = Dirs.CACHE_DIR / "recent_files.json"
+    STARTUP_PROFILE = Dirs.CACHE_DIR / "startup_profile.json"
+    HANDLER_TRACE = Dirs.CACHE_DIR / "handler_trace.json"
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
-import time
-from typing import Callable
+import traceback
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from queue import SimpleQueue
+from typing import Callable, Hashable, Iterable
 from pathlib import Path
 
 import blf
@@ -11,37 +15,164 @@ import gpu
 from gpu.types import GPUBatch, GPUShader
 from mathutils import Vector as V
 from gpu_extras.batch import batch_for_shader
+import numpy as np
 
-from .math import Line, Rectangle, pad_list
+from .handlers import AppTimer
+from .image_decode import UnsupportedImageError, get_thumbnail_size, load_thumbnail, read_png_size
+from .math import Line, Rectangle, ShelfPacker, pad_list
 
-textures: DrawTexture = []
+
+class CachedTexture:
+    """An image loaded from disk, shared by all DrawTextures that show the same version of a file"""
+
+    def __init__(self, path: Path, mtime: float):
+        self.path = path
+        self.mtime = mtime
+        self.image = bpy.data.images.load(str(path), check_existing=False)
+        self.image.name = f".{path.name}_{mtime}"
+        self.texture = gpu.texture.from_image(self.image)
+        self.dimensions = V(self.image.size)
+        # The pixels are stored as 8 bit or 32 bit float RGBA
+        self.memory = int(self.dimensions.x * self.dimensions.y) * 4 * (4 if self.image.is_float else 1)
+        self.users = 0
+        self.evicted = False
+
+    @property
+    def valid(self) -> bool:
+        """Images can be removed by undo or loading a new file, at which point this needs to be loaded again"""
+        if self.evicted:
+            return False
+        try:
+            self.image.name
+        except ReferenceError:
+            return False
+        return True
+
+    def free(self):
+        self.evicted = True
+        try:
+            bpy.data.images.remove(self.image)
+        except ReferenceError:
+            pass
+
+
+class TextureCache:
+    """Shares images between DrawTextures, keyed by their path and modification time,
+    so that the same file is only loaded once, and is loaded again when it changes.
+    The estimated pixel memory of all cached images is kept below the budget by evicting the least recently drawn ones
+    that no DrawTexture is using, so images are never loaded again from inside a draw callback because of the budget.
+    If every image is in use, the budget is exceeded until some of them are released."""
+
+    def __init__(self, budget: int = 256 * 1024 * 1024):
+        self.budget = budget
+        "The maximum estimated memory of the cached images in bytes"
+        self.entries: OrderedDict[tuple[str, float], CachedTexture] = OrderedDict()
+        self.memory = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path: Path) -> CachedTexture:
+        """Get the cached image for the current version of a file, loading it if needed"""
+        key = (str(path), path.stat().st_mtime)
+        if (entry := self.entries.get(key)) and entry.valid:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        if entry:
+            self._remove(key)
+        entry = self.entries[key] = CachedTexture(path, key[1])
+        self.memory += entry.memory
+
+        # Remove older versions of the file that aren't being shown any more
+        for old_key, old_entry in list(self.entries.items()):
+            if old_key[0] == key[0] and old_key != key and not old_entry.users:
+                self._remove(old_key)
+        self.evict()
+        return entry
+
+    def touch(self, entry: CachedTexture):
+        """Mark an entry as the most recently drawn"""
+        self.entries.move_to_end((str(entry.path), entry.mtime))
+
+    def release(self, entry: CachedTexture):
+        entry.users -= 1
+
+    def evict(self):
+        """Remove the least recently drawn images that aren't in use until the memory is within the budget.
+        The most recently loaded image is always kept, even if it is larger than the budget on its own."""
+        if self.memory <= self.budget:
+            return
+        for key, entry in list(self.entries.items())[:-1]:
+            if self.memory <= self.budget:
+                break
+            if not entry.users:
+                self._remove(key)
+                self.evictions += 1
+
+    def _remove(self, key: tuple[str, float]):
+        entry = self.entries.pop(key)
+        self.memory -= entry.memory
+        entry.free()
+
+    def clear(self):
+        for key in list(self.entries):
+            self._remove(key)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.entries)} images, {self.memory / 1024 / 1024:.1f}MB of {self.budget / 1024 / 1024:.0f}MB, "
+            f"{self.hits} hits, {self.misses} misses, {self.evictions} evictions"
+        )
+
+
+texture_cache = TextureCache()
+
+# All DrawTextures that haven't been removed. The dictionary is used as an ordered set.
+textures: dict[DrawTexture, None] = {}
 
 
 class DrawTexture:
     """Helper class to represent a GPUTexture"""
 
     def __init__(self, path: Path):
-        self.image = None
+        self.entry: CachedTexture | None = None
         self.on_update: list[Callable] = []
         self.update_texture(path)
 
     def update_texture(self, path: Path):
-        if self.image:
-            bpy.data.images.remove(self.image)
-
-        name = f".{path.name}_{time.time()}"
-        image = bpy.data.images.load(str(path), check_existing=False)
-        image.name = name
+        entry = texture_cache.get(path)
+        entry.users += 1
+        if self.entry:
+            texture_cache.release(self.entry)
 
-        self.name = name
-        self.image = image
-        self.dimensions = V(image.size)
-        self.texture = gpu.texture.from_image(image)
-        textures.append(self)
+        self.path = path
+        self.entry = entry
+        self.dimensions = entry.dimensions.copy()
+        textures[self] = None
 
         for func in self.on_update:
             func()
 
+    @property
+    def name(self) -> str:
+        return self.entry.image.name
+
+    @property
+    def image(self) -> bpy.types.Image:
+        return self.entry.image
+
+    @property
+    def texture(self) -> gpu.types.GPUTexture:
+        if not self.entry.valid:
+            # The image has been removed by undo or loading a new file
+            texture_cache.release(self.entry)
+            self.entry = texture_cache.get(self.path)
+            self.entry.users += 1
+        return self.entry.texture
+
     @property
     def width(self):
         return self.dimensions.x
@@ -51,29 +182,273 @@ class DrawTexture:
         return self.dimensions.y
 
     def draw(self, position: V, scale: float):
-        tex_coords = ((0, 0), (1, 0), (0, 1), (1, 1))
-        coords = (
-            (0, 0),
-            (self.width, 0),
-            (0, self.height),
-            (self.width, self.height),
-        )
-        coords = [V(c) * scale + position for c in coords]
-        indices = ((0, 1, 2), (2, 1, 3))
+        texture = self.texture
+        texture_cache.touch(self.entry)
+        draw_gpu_texture(texture, position, self.dimensions * scale)
+
+    def remove(self):
+        """Stop using the image. It stays in the texture cache until it is evicted."""
+        textures.pop(self, None)
+        if self.entry:
+            texture_cache.release(self.entry)
+            self.entry = None
+
+
+class AtlasEntry:
+    __slots__ = ["page", "rectangle", "uvs"]
+
+    def __init__(self, page: AtlasPage, rectangle: Rectangle):
+        self.page = page
+        self.rectangle = rectangle
+        "The pixels of the page that the image was placed in"
+        size = page.size
+        self.uvs = (rectangle.minx / size, rectangle.miny / size, rectangle.maxx / size, rectangle.maxy / size)
+
+
+class AtlasPage:
+    """One of the textures of an atlas, with a copy of its pixels, so that it can be updated when images are added"""
+
+    def __init__(self, size: int, padding: int):
+        self.size = size
+        self.packer = ShelfPacker(size, size, padding)
+        self.pixels = np.zeros((size, size, 4), dtype=np.float32)
+        self.texture: gpu.types.GPUTexture | None = None
+        self.dirty = True
+        self.count = 0
+
+    def get_texture(self) -> gpu.types.GPUTexture:
+        """Get the texture of the page, uploading the pixels again if they have changed since it was last drawn"""
+        if self.dirty or not self.texture:
+            buffer = gpu.types.Buffer("FLOAT", self.pixels.size, self.pixels.reshape(-1))
+            self.texture = gpu.types.GPUTexture((self.size, self.size), format="RGBA16F", data=buffer)
+            self.dirty = False
+        return self.texture
+
+
+class TextureAtlas:
+    """Packs many small images into a few large textures, so that they can all be drawn with one batch per texture,
+    rather than each needing its own batch and texture.
+    Images are added and removed without moving any of the others, so only the pages that changed are uploaded again.
+    ```
+    atlas = TextureAtlas()
+    atlas.add("thumbnail", pixels)
+    atlas.draw([("thumbnail", (10, 10), (64, 64))])
+    ```"""
+
+    def __init__(self, page_size: int = 1024, padding: int = 1):
+        self.page_size = page_size
+        self.padding = padding
+        self.pages: list[AtlasPage] = []
+        self.entries: dict[Hashable, AtlasEntry] = {}
+
+    def add(self, key: Hashable, pixels: np.ndarray) -> AtlasEntry:
+        """Add an RGBA image of shape (height, width, 4), with the first row at the top"""
+        if key in self.entries:
+            self.remove(key)
+        height, width = pixels.shape[:2]
+        if max(width, height) + self.padding * 2 > self.page_size:
+            raise ValueError(f"A {width}x{height} image is too large for an atlas with {self.page_size}px pages")
+
+        for page in self.pages:
+            if rectangle := page.packer.insert(width, height):
+                break
+        else:
+            page = AtlasPage(self.page_size, self.padding)
+            self.pages.append(page)
+            rectangle = page.packer.insert(width, height)
+
+        x, y = int(rectangle.minx), int(rectangle.miny)
+        # Textures start from the bottom row
+        page.pixels[y : y + height, x : x + width] = pixels[::-1]
+        page.dirty = True
+        page.count += 1
+        entry = self.entries[key] = AtlasEntry(page, rectangle)
+        return entry
+
+    def remove(self, key: Hashable):
+        entry = self.entries.pop(key)
+        page = entry.page
+        rectangle = entry.rectangle
+        page.packer.remove(rectangle)
+        # Clear the pixels, so that they don't bleed into the padding of whatever is placed here next
+        page.pixels[int(rectangle.miny) : int(rectangle.maxy), int(rectangle.minx) : int(rectangle.maxx)] = 0
+        page.count -= 1
+        if not page.count and len(self.pages) > 1:
+            self.pages.remove(page)
+
+    def draw(self, items: Iterable[tuple[Hashable, V, V]]):
+        """Draw images in the atlas, given as (key, position of the bottom left corner, size) tuples"""
+        vertices: dict[AtlasPage, tuple[list, list, list]] = {}
+        for key, position, size in items:
+            entry = self.entries[key]
+            if not (page_vertices := vertices.get(entry.page)):
+                page_vertices = vertices[entry.page] = ([], [], [])
+            positions, tex_coords, keys = page_vertices
+            keys.append(id(key))
+            x, y = position
+            width, height = size
+            u1, v1, u2, v2 = entry.uvs
+            positions.extend(((x, y), (x + width, y), (x + width, y + height)))
+            positions.extend(((x, y), (x + width, y + height), (x, y + height)))
+            tex_coords.extend(((u1, v1), (u2, v1), (u2, v2), (u1, v1), (u2, v2), (u1, v2)))
+
         shader = Shaders.image
-        batch: GPUBatch = batch_for_shader(
-            shader,
-            "TRIS",
-            {"pos": coords, "texCoord": tex_coords},
-            indices=indices,
-        )
-        shader.uniform_sampler("image", self.texture)
-        shader.bind()
-        batch.draw(shader)
+        gpu.state.blend_set("ALPHA")
+        for page, (positions, tex_coords, keys) in vertices.items():
+            # The batch is kept between redraws, and only rebuilt when the images in it move
+            content = {"pos": positions, "texCoord": tex_coords}
+            batch = batch_cache.get(("atlas", id(page), tuple(keys)), shader, "TRIS", content)
+            shader.uniform_sampler("image", page.get_texture())
+            shader.bind()
+            batch.draw(shader)
+
+    def clear(self):
+        self.pages.clear()
+        self.entries.clear()
+
+
+# Thumbnails are decoded in worker threads, and then put in this queue to be uploaded on the main thread
+thumbnail_executor: ThreadPoolExecutor | None = None
+finished_thumbnails: SimpleQueue[tuple[ThumbnailTexture, Future]] = SimpleQueue()
+loading_thumbnails: dict[ThumbnailTexture, None] = {}
+_thumbnail_timer: AppTimer | None = None
+
+
+class ThumbnailTexture:
+    """Like a DrawTexture, but the image is decoded and shrunk to fit inside max_size in a worker thread,
+    and only the small result is uploaded to the GPU. Until it is ready, a placeholder rectangle is drawn instead.
+    Only 8 bit PNGs can be decoded this way, other images are loaded by blender with a DrawTexture.
+    If an atlas is given, the thumbnail is added to it rather than getting its own texture,
+    and draw_thumbnails can be used to draw all of the thumbnails in the atlas with a single batch."""
+
+    def __init__(
+        self,
+        path: Path,
+        max_size: tuple[int, int],
+        placeholder_color: V = (0.2, 0.2, 0.2, 1),
+        atlas: TextureAtlas | None = None,
+    ):
+        self.path = path
+        self.max_size = tuple(max_size)
+        self.placeholder_color = placeholder_color
+        self.atlas = atlas
+        self.texture: gpu.types.GPUTexture | None = None
+        self.fallback: DrawTexture | None = None
+        self.future: Future | None = None
+        self.on_update: list[Callable] = []
+
+        try:
+            size = read_png_size(path)
+        except (UnsupportedImageError, OSError):
+            self.fallback = DrawTexture(path)
+            size = (int(self.fallback.width), int(self.fallback.height))
+        self.dimensions = V(get_thumbnail_size(size, self.max_size))
+
+        if not self.fallback:
+            global thumbnail_executor, _thumbnail_timer
+            if not thumbnail_executor:
+                thumbnail_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sd_thumbnails")
+            self.future = thumbnail_executor.submit(load_thumbnail, path, self.max_size)
+            self.future.add_done_callback(lambda future: finished_thumbnails.put((self, future)))
+            loading_thumbnails[self] = None
+            if not _thumbnail_timer or _thumbnail_timer.finished:
+                _thumbnail_timer = AppTimer(upload_thumbnails, persistent=True)
+
+    @property
+    def ready(self) -> bool:
+        return self.texture is not None or self.fallback is not None or self.in_atlas
+
+    @property
+    def in_atlas(self) -> bool:
+        return self.atlas is not None and self in self.atlas.entries
+
+    @property
+    def width(self):
+        return self.dimensions.x
+
+    @property
+    def height(self):
+        return self.dimensions.y
+
+    def upload(self, pixels: np.ndarray):
+        """Create the GPU texture from the decoded pixels. This needs to be called from the main thread."""
+        height, width = pixels.shape[:2]
+        self.dimensions = V((width, height))
+        if self.atlas:
+            try:
+                self.atlas.add(self, pixels)
+                return
+            except ValueError:
+                # The image is too large for the atlas pages, so it gets its own texture instead
+                pass
+        # Textures start from the bottom row
+        data = np.ascontiguousarray(pixels[::-1], dtype=np.float32).reshape(-1)
+        buffer = gpu.types.Buffer("FLOAT", data.size, data)
+        self.texture = gpu.types.GPUTexture((width, height), format="RGBA16F", data=buffer)
+
+    def on_loaded(self, future: Future):
+        loading_thumbnails.pop(self, None)
+        if future.cancelled():
+            return
+        try:
+            self.upload(future.result())
+        except Exception as e:
+            # Let blender try to load images that couldn't be decoded, e.g. because they are truncated
+            if not isinstance(e, UnsupportedImageError):
+                traceback.print_exc()
+            self.fallback = DrawTexture(self.path)
+        for func in self.on_update:
+            func()
+
+    def draw(self, position: V, scale: float = 1):
+        size = self.dimensions * scale
+        if self.texture:
+            draw_gpu_texture(self.texture, position, size)
+        elif self.in_atlas:
+            self.atlas.draw([(self, position, size)])
+        elif self.fallback:
+            self.fallback.draw(position, size.x / self.fallback.width)
+        else:
+            draw_rectangle(Rectangle(position, V(position) + size), self.placeholder_color)
 
     def remove(self):
-        textures.remove(self)
-        bpy.data.images.remove(self.image)
+        if self.future:
+            self.future.cancel()
+        loading_thumbnails.pop(self, None)
+        if self.fallback:
+            self.fallback.remove()
+        if self.in_atlas:
+            self.atlas.remove(self)
+        self.texture = self.fallback = None
+
+
+def draw_thumbnails(thumbnails: Iterable[tuple[ThumbnailTexture, V, float]]):
+    """Draw many thumbnails, given as (thumbnail, position, scale) tuples.
+    All of the thumbnails in each atlas are drawn together, with one batch per atlas page."""
+    atlas_items: dict[TextureAtlas, list[tuple[ThumbnailTexture, V, V]]] = {}
+    for thumbnail, position, scale in thumbnails:
+        if thumbnail.in_atlas:
+            atlas_items.setdefault(thumbnail.atlas, []).append((thumbnail, position, thumbnail.dimensions * scale))
+        else:
+            thumbnail.draw(position, scale)
+
+    for atlas, items in atlas_items.items():
+        atlas.draw(items)
+
+
+def upload_thumbnails():
+    """Upload the thumbnails that have finished decoding, keeping the timer running while any are still loading"""
+    global _thumbnail_timer
+    while not finished_thumbnails.empty():
+        thumbnail, future = finished_thumbnails.get()
+        if thumbnail in loading_thumbnails:
+            try:
+                thumbnail.on_loaded(future)
+            except Exception:
+                traceback.print_exc()
+    if loading_thumbnails:
+        return 0.05
+    _thumbnail_timer = None
 
 
 class Shaders:
@@ -81,22 +456,145 @@ class Shaders:
         _prefix = "" if bpy.app.version >= (4, 0, 0) else "2D_"
         uniform_color: GPUShader = gpu.shader.from_builtin(f"{_prefix}UNIFORM_COLOR")
         image: GPUShader = gpu.shader.from_builtin(f"{_prefix}IMAGE")
+        smooth_color: GPUShader = gpu.shader.from_builtin(f"{_prefix}SMOOTH_COLOR")
+
+
+def draw_gpu_texture(texture: gpu.types.GPUTexture, position: V, size: V):
+    """Draw a texture with its bottom left corner at position"""
+    x, y = position
+    width, height = size
+    coords = ((x, y), (x + width, y), (x, y + height), (x + width, y + height))
+    tex_coords = ((0, 0), (1, 0), (0, 1), (1, 1))
+    indices = ((0, 1, 2), (2, 1, 3))
+    shader = Shaders.image
+    batch: GPUBatch = batch_for_shader(
+        shader,
+        "TRIS",
+        {"pos": coords, "texCoord": tex_coords},
+        indices=indices,
+    )
+    shader.uniform_sampler("image", texture)
+    shader.bind()
+    batch.draw(shader)
 
 
-def draw_line(line: Line, color: V = V((1, 1, 1, 1)), thickness: float = 1.0):
-    """Draw a line in the 2D viewport"""
+def hash_geometry(batch_type: str, content: dict, indices=None) -> int:
+    """Get a hash of the vertex data of a batch, so that it can be compared with the data it was created with"""
+    return hash(
+        (
+            batch_type,
+            tuple((name, tuple(tuple(v) for v in values)) for name, values in content.items()),
+            tuple(tuple(i) for i in indices) if indices else None,
+        )
+    )
+
+
+class CachedBatch:
+    __slots__ = ("batch", "geometry_hash", "last_used")
+
+    def __init__(self, batch: GPUBatch, geometry_hash: int, last_used: int):
+        self.batch = batch
+        self.geometry_hash = geometry_hash
+        self.last_used = last_used
+
+
+class BatchCache:
+    """Keeps GPUBatches between redraws, so that drawing the same geometry again doesn't allocate a new batch.
+    Batches are stored by a key chosen by the caller, and are only rebuilt when the geometry for that key changes.
+    Batches that haven't been used since the last collection are freed.
+
+    The factory that creates the batches can be replaced, so that the cache can be used without a GPU:
+    ```
+    cache = BatchCache(factory=lambda shader, batch_type, content, indices=None: object())
+    ```"""
+
+    def __init__(self, factory: Callable[..., GPUBatch] = batch_for_shader, collect_interval: float = 5):
+        self.factory = factory
+        self.collect_interval = collect_interval
+        "How often unused batches are freed, in seconds. If zero, collect needs to be called manually."
+        self.entries: dict[Hashable, CachedBatch] = {}
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.freed = 0
+        self._timer: AppTimer | None = None
+
+    def get(self, key: Hashable, shader: GPUShader, batch_type: str, content: dict, indices=None) -> GPUBatch:
+        """Get the batch for the given key, creating it if it doesn't exist, or if the geometry has changed"""
+        geometry_hash = hash_geometry(batch_type, content, indices)
+        entry = self.entries.get(key)
+        if entry and entry.geometry_hash == geometry_hash:
+            entry.last_used = self.generation
+            self.hits += 1
+            return entry.batch
+
+        self.misses += 1
+        if indices:
+            batch = self.factory(shader, batch_type, content, indices=indices)
+        else:
+            batch = self.factory(shader, batch_type, content)
+        self.entries[key] = CachedBatch(batch, geometry_hash, self.generation)
+
+        if self.collect_interval and not self._timer:
+            self._timer = AppTimer(self._collect_timer, self.collect_interval, persistent=True)
+        return batch
+
+    def collect(self) -> int:
+        """Free all batches that haven't been used since the last time this was called, and return how many were freed"""
+        unused = [key for key, entry in self.entries.items() if entry.last_used < self.generation]
+        for key in unused:
+            del self.entries[key]
+        self.generation += 1
+        self.freed += len(unused)
+        return len(unused)
+
+    def _collect_timer(self):
+        self.collect()
+        if not self.entries:
+            self._timer = None
+            return None
+        return self.collect_interval
+
+    def clear(self):
+        self.entries.clear()
+        if self._timer:
+            self._timer.remove()
+            self._timer = None
+
+
+batch_cache = BatchCache()
+
+
+def draw_line(line: Line, color: V = V((1, 1, 1, 1)), thickness: float = 1.0, key: Hashable = None):
+    """Draw a line in the 2D viewport.
+    If a key is given, the batch is kept between redraws, and only rebuilt when the line changes."""
     # Add alpha channel if necessary
     color = pad_list(color, 4, 1)
 
     shader = Shaders.uniform_color
-    batch: GPUBatch = batch_for_shader(shader, "LINES", {"pos": list(line)})
+    content = {"pos": list(line)}
+    if key is None:
+        batch: GPUBatch = batch_for_shader(shader, "LINES", content)
+    else:
+        batch = batch_cache.get(("line", key), shader, "LINES", content)
     shader.uniform_float("color", [*color])
     gpu.state.line_width_set(thickness)
     shader.bind()
     batch.draw(shader)
 
 
-def draw_rectangle(rectangle: Rectangle, color: V = V((1, 0, 1, 1)), lines=False, thickness: float = 1.0):
+RECTANGLE_LINE_INDICES = ((0, 1), (1, 2), (2, 3), (3, 0))
+
+
+def draw_rectangle(
+    rectangle: Rectangle,
+    color: V = V((1, 0, 1, 1)),
+    lines=False,
+    thickness: float = 1.0,
+    key: Hashable = None,
+):
+    """Draw a filled or outlined rectangle in the 2D viewport.
+    If a key is given, the batch is kept between redraws, and only rebuilt when the rectangle changes."""
     # Add alpha channel if necessary
     color = pad_list(color, 4, 1)
     shader = Shaders.uniform_color
@@ -104,32 +602,170 @@ def draw_rectangle(rectangle: Rectangle, color: V = V((1, 0, 1, 1)), lines=False
 
     if lines:
         gpu.state.line_width_set(thickness)
-        batch: GPUBatch = batch_for_shader(
-            shader,
-            "LINES",
-            {"pos": rectangle.coords},
-            indices=[
-                (0, 1),
-                (1, 2),
-                (2, 3),
-                (3, 0),
-            ],
-        )
+        batch_type, indices = "LINES", RECTANGLE_LINE_INDICES
     else:
-        batch: GPUBatch = batch_for_shader(shader, "TRIS", {"pos": rectangle.coords}, indices=rectangle.indices)
+        batch_type, indices = "TRIS", rectangle.indices
+    content = {"pos": rectangle.coords}
+
+    if key is None:
+        batch: GPUBatch = batch_for_shader(shader, batch_type, content, indices=indices)
+    else:
+        batch = batch_cache.get(("rectangle", key, lines), shader, batch_type, content, indices=indices)
     shader.uniform_float("color", [*color])
     shader.bind()
     batch.draw(shader)
 
 
+class DrawList:
+    """Collects lines and rectangles during a draw callback, and then draws them all at once,
+    with one batch for all filled shapes, and one for the lines of each thickness.
+    This is much faster than drawing each shape separately, as each of those needs its own batch and draw call.
+    Shapes are drawn in the order they were added within each batch, with filled shapes below lines.
+    ```
+    with DrawList() as draw_list:
+        for rectangle in rectangles:
+            draw_list.add_rectangle(rectangle, (1, 0, 0, 1))
+    ```"""
+
+    def __init__(self):
+        self.tris: tuple[list, list] = ([], [])
+        "The positions and colors of the vertices of filled shapes"
+        self.lines: dict[float, tuple[list, list]] = {}
+        "The positions and colors of the vertices of lines, by line thickness"
+
+    def __enter__(self) -> DrawList:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.clear()
+
+    def _get_lines(self, thickness: float) -> tuple[list, list]:
+        if not (lines := self.lines.get(thickness)):
+            lines = self.lines[thickness] = ([], [])
+        return lines
+
+    def add_line(self, line: Line, color: V = (1, 1, 1, 1), thickness: float = 1.0):
+        positions, colors = self._get_lines(thickness)
+        color = tuple(color) if len(color) == 4 else (*color, 1)
+        positions.extend((tuple(line.start), tuple(line.end)))
+        colors.extend((color, color))
+
+    def add_rectangle(self, rectangle: Rectangle, color: V = (1, 0, 1, 1), lines=False, thickness: float = 1.0):
+        color = tuple(color) if len(color) == 4 else (*color, 1)
+        minx, miny = rectangle.min
+        maxx, maxy = rectangle.max
+        if lines:
+            positions, colors = self._get_lines(thickness)
+            a, b, c, d = (minx, miny), (maxx, miny), (maxx, maxy), (minx, maxy)
+            positions.extend((a, b, b, c, c, d, d, a))
+            colors.extend((color,) * 8)
+        else:
+            positions, colors = self.tris
+            positions.extend(((minx, miny), (maxx, miny), (maxx, maxy), (minx, miny), (maxx, maxy), (minx, maxy)))
+            colors.extend((color,) * 6)
+
+    def get_batch_contents(self) -> list[tuple[str, float, dict]]:
+        """Get the type, line thickness and vertex data of each batch that will be drawn"""
+        contents = []
+        positions, colors = self.tris
+        if positions:
+            contents.append(("TRIS", 0, {"pos": positions, "color": colors}))
+        for thickness, (positions, colors) in self.lines.items():
+            if positions:
+                contents.append(("LINES", thickness, {"pos": positions, "color": colors}))
+        return contents
+
+    def flush(self):
+        """Draw everything that has been added, and then clear it"""
+        shader = Shaders.smooth_color
+        gpu.state.blend_set("ALPHA")
+        shader.bind()
+        for batch_type, thickness, content in self.get_batch_contents():
+            if thickness:
+                gpu.state.line_width_set(thickness)
+            batch: GPUBatch = batch_for_shader(shader, batch_type, content)
+            batch.draw(shader)
+        self.clear()
+
+    def clear(self):
+        self.tris = ([], [])
+        self.lines.clear()
+
+
+class TextMetrics:
+    """Caches the dimensions of text for each font and size, as measuring text with blf is fairly slow,
+    and the same text is usually measured on every redraw."""
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.entries: OrderedDict[tuple[int, float, str], tuple[float, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_dimensions(self, text: str, size: float, fontid: int = 0) -> tuple[float, float]:
+        key = (fontid, size, text)
+        if (dimensions := self.entries.get(key)) is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return dimensions
+
+        self.misses += 1
+        # This leaves the font at this size, so it needs to be set again before drawing with it
+        blf.size(fontid, size)
+        dimensions = self.entries[key] = blf.dimensions(fontid, text)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return dimensions
+
+    def get_width(self, text: str, size: float, fontid: int = 0) -> float:
+        return self.get_dimensions(text, size, fontid)[0]
+
+    def clear(self):
+        self.entries.clear()
+        wrap_lines.cache_clear()
+
+
+text_metrics = TextMetrics()
+
+
+@lru_cache(maxsize=512)
+def wrap_lines(text: str, width: float, size: float, fontid: int = 0) -> tuple[str, ...]:
+    """Split text into lines that are no wider than width.
+    Each word is only measured once, and the widths of the words in a line are added up,
+    rather than measuring the whole line again every time a word is added."""
+    lines = []
+    line = ""
+    line_width = 0
+    for word in text.split():
+        word = f" {word}"
+        word_width = text_metrics.get_width(word, size, fontid)
+        if line_width + word_width <= width or not line:
+            line += word
+            line_width += word_width
+        else:
+            lines.append(line)
+            line = word
+            line_width = word_width
+    if line:
+        lines.append(line)
+    return tuple(lines)
+
+
 def set_text_settings(position: V = (0, 0), size: int = 1, color: V = (1, 1, 1, 1), fontid: int = 0):
     blf.size(fontid, size)
     blf.color(fontid, color[0], color[1], color[2], color[3])
     blf.position(fontid, position[0], position[1], 0)
 
 
-def get_text_dimensions(text: str, fontid: int = 0):
-    return V(blf.dimensions(fontid, text))
+def get_text_dimensions(text: str, fontid: int = 0, size: float | None = None):
+    """Get the dimensions of text.
+    If the size is given, the result is cached, otherwise the text is measured at the current size of the font."""
+    if size is None:
+        return V(blf.dimensions(fontid, text))
+    return V(text_metrics.get_dimensions(text, size, fontid))
 
 
 def draw_text(text: str, fontid: int = 0):
@@ -137,8 +773,15 @@ def draw_text(text: str, fontid: int = 0):
 
 
 def unregister():
-    for texture in textures:
-        try:
-            texture.remove()
-        except ReferenceError:
-            pass
+    batch_cache.clear()
+    text_metrics.clear()
+    for thumbnail in list(loading_thumbnails):
+        thumbnail.remove()
+    # The timer itself is removed by the handlers module
+    global thumbnail_executor, _thumbnail_timer
+    _thumbnail_timer = None
+    if thumbnail_executor:
+        thumbnail_executor.shutdown(wait=False, cancel_futures=True)
+        thumbnail_executor = None
+    textures.clear()
+    texture_cache.clear()
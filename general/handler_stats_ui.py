@@ -0,0 +1,150 @@
+import bpy
+from bpy.types import Context, UILayout
+
+from .. import handler_stats
+from ..btypes import BOperator, BPanel
+from ..drawing import draw_text, set_text_settings
+from ..handlers import AppTimer, DrawHandler, SchedulerStats, scheduler
+
+"""A panel and an on screen display for the handler timing recorded by handler_stats.py"""
+
+hud: DrawHandler | None = None
+hud_timer: AppTimer | None = None
+
+# The number of callbacks to show in the panel and the HUD
+MAX_ENTRIES = 12
+
+
+def format_ms(seconds: float) -> str:
+    return f"{seconds * 1000:.2f}ms"
+
+
+def draw_hud():
+    """Draw the slowest callbacks in the top left of the 3D viewport"""
+    scale = bpy.context.preferences.system.ui_scale
+    size = 11 * scale
+    line_height = size * 1.5
+    x = 20 * scale
+    y = bpy.context.region.height - 80 * scale
+    columns = (0, 280 * scale, 340 * scale, 420 * scale)
+
+    rows = [("Callback", "Calls", "Recent", "Max")]
+    for entry in handler_stats.get_stats("recent_mean")[:MAX_ENTRIES]:
+        rows.append((entry.name, str(entry.calls), format_ms(entry.recent_mean), format_ms(entry.max)))
+
+    for i, row in enumerate(rows):
+        color = (1, 1, 1, 0.6) if i == 0 else (1, 1, 1, 0.9)
+        for column, text in zip(columns, row):
+            set_text_settings(position=(x + column, y - i * line_height), size=size, color=color)
+            draw_text(text)
+
+    set_text_settings(position=(x, y - (len(rows) + 0.5) * line_height), size=size, color=(1, 1, 1, 0.6))
+    draw_text(f"Timers: {scheduler.stats.summary()}")
+
+
+def redraw_viewports():
+    """The HUD is only drawn when the viewport is redrawn, so keep redrawing it while it is shown"""
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == "VIEW_3D":
+                area.tag_redraw()
+    return 0.5
+
+
+@BOperator("sd")
+class SD_OT_toggle_handler_timing(BOperator.type):
+    """Toggle recording how long each handler, draw handler and timer callback takes"""
+
+    def execute(self, context):
+        handler_stats.set_enabled(not handler_stats.enabled)
+
+
+@BOperator("sd")
+class SD_OT_toggle_handler_hud(BOperator.type):
+    """Toggle showing the slowest callbacks in the 3D viewport"""
+
+    def execute(self, context):
+        global hud, hud_timer
+        if hud:
+            hud.remove()
+            hud_timer.remove()
+            hud = hud_timer = None
+        else:
+            handler_stats.set_enabled(True)
+            hud = DrawHandler(draw_hud, bpy.types.SpaceView3D)
+            hud_timer = AppTimer(redraw_viewports, persistent=True)
+        redraw_viewports()
+
+
+@BOperator("sd")
+class SD_OT_export_handler_trace(BOperator.type):
+    """Save the recent callback timings as a Chrome trace file, which can be opened in chrome://tracing or Perfetto"""
+
+    def execute(self, context):
+        path = handler_stats.dump_chrome_trace()
+        self.report({"INFO"}, f"Saved handler trace to {path}")
+
+
+@BOperator("sd")
+class SD_OT_clear_handler_stats(BOperator.type):
+    """Clear the recorded callback timings and timer scheduler stats"""
+
+    def execute(self, context):
+        handler_stats.clear()
+        scheduler.stats = SchedulerStats()
+
+
+@BPanel("VIEW_3D", category="SD", label="Handler timing", default_closed=True)
+class SD_PT_handler_stats(BPanel.type):
+    def draw(self, context: Context):
+        layout: UILayout = self.layout
+        row = layout.row(align=True)
+        SD_OT_toggle_handler_timing.draw_button(
+            row,
+            text="Record",
+            icon="REC",
+            depress=handler_stats.enabled,
+        )
+        SD_OT_toggle_handler_hud.draw_button(row, text="HUD", icon="OVERLAY", depress=hud is not None)
+        SD_OT_export_handler_trace.draw_button(row, text="", icon="EXPORT")
+        SD_OT_clear_handler_stats.draw_button(row, text="", icon="TRASH")
+
+        # The scheduler stats are always collected, even when callbacks aren't being recorded
+        stats = scheduler.stats
+        col = layout.box().column(align=True)
+        col.label(text="Timer scheduler")
+        row = col.row()
+        row.label(text=f"{stats.ticks} ticks")
+        row.label(text=f"{stats.calls} calls")
+        row.label(text=f"Backlog {stats.backlog} (max {stats.max_backlog})")
+        row = col.row()
+        row.label(text=f"{stats.over_budget_ticks} over budget")
+        row.label(text=f"Late {format_ms(stats.mean_lateness)}")
+        row.label(text=f"Max {format_ms(stats.max_lateness)}")
+
+        entries = handler_stats.get_stats()[:MAX_ENTRIES]
+        if not entries:
+            layout.label(text="No callbacks have been recorded")
+            return
+
+        for entry in entries:
+            col = layout.box().column(align=True)
+            col.label(text=entry.name)
+            row = col.row()
+            row.label(text=f"{entry.calls} calls")
+            row.label(text=f"Mean {format_ms(entry.mean)}")
+            row.label(text=f"Max {format_ms(entry.max)}")
+
+            # Only show the histogram buckets that have calls in them
+            row = col.row()
+            row.scale_y = 0.7
+            for label, count in zip(handler_stats.HISTOGRAM_LABELS, entry.histogram):
+                if count:
+                    row.label(text=f"{label}: {count}")
+
+
+def unregister():
+    # The draw handler and timer are removed by the handlers module
+    global hud, hud_timer
+    hud = hud_timer = None
+    handler_stats.set_enabled(False)
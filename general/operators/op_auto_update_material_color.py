@@ -41,10 +41,11 @@ class DummyNode:
         return min(results, key=lambda n: n.depth)
 
 
-@BOperator()
+@BOperator(undo=True)
 class SD_OT_auto_update_material_color(BOperator.type):
     """Update the material viewport display colors of every material in the scene, to match the color in the shader."""
 
+    @staticmethod
     def get_main_color_node(node_tree: ShaderNodeTree):
         out_node = next((n for n in node_tree.nodes if isinstance(n, ShaderNodeOutputMaterial)), None)
 
@@ -56,12 +57,27 @@ class SD_OT_auto_update_material_color(BOperator.type):
         principled: Node = dummy_principled.node
         return principled
 
+    def invoke(self, context, event):
+        return self.start_task(context, self.update_colors())
+
     def execute(self, context):
-        for mat in bpy.data.materials:
-            if not mat.node_tree:
+        return self.run_task(self.update_colors())
+
+    def update_colors(self):
+        # Use names, as materials could be removed while the task is running
+        names = [mat.name for mat in bpy.data.materials if mat.node_tree]
+        for i, name in enumerate(names):
+            yield i / len(names)
+            mat = bpy.data.materials.get(name)
+            if not mat or not mat.node_tree:
+                continue
+            try:
+                node = self.get_main_color_node(mat.node_tree)
+            except ValueError:
+                # There's no principled node connected to the output
                 continue
-            node = self.get_main_color_node(mat.node_tree)
-            mat.diffuse_color = node.inputs[0].default_value
+            if node:
+                mat.diffuse_color = node.inputs[0].default_value
 
 
 def menu_entry(self, context):
@@ -13,7 +13,12 @@ class SD_OT_batch_change_view_settings(BOperator.type):
     clip_start: FloatProperty(name="Clip Start", subtype="DISTANCE", default=0.01)
     clip_end: FloatProperty(name="Clip End", subtype="DISTANCE", default=1000)
 
+    # Set when run from the UI, and cleared as soon as execute uses it, as redo reuses the same instance.
+    # Scripts and redo call execute directly, and expect it to be finished when it returns
+    _invoked = False
+
     def invoke(self, context: Context, event):
+        self._invoked = True
         if context.area.type == "VIEW_3D":
             space = context.area.spaces.active
             self.focal_length = space.lens
@@ -28,7 +33,19 @@ class SD_OT_batch_change_view_settings(BOperator.type):
         layout.prop(self, "clip_end")
 
     def execute(self, context):
-        for screen in bpy.data.screens:
+        # Execute is called by the confirmation popup, so that is where the task needs to be started from
+        invoked, self._invoked = self._invoked, False
+        if invoked and not self.options.is_repeat:
+            return self.start_task(context, self.change_view_settings())
+        return self.run_task(self.change_view_settings())
+
+    def change_view_settings(self):
+        # Use names, as screens could be removed while the task is running
+        names = [screen.name for screen in bpy.data.screens]
+        for i, name in enumerate(names):
+            yield i / len(names)
+            if not (screen := bpy.data.screens.get(name)):
+                continue
             for area in screen.areas:
                 if area.type != "VIEW_3D":
                     continue
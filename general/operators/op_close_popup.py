@@ -1,6 +1,5 @@
-import bpy
-
 from ...btypes import BOperator
+from ...handlers import AppTimer
 
 
 @BOperator()
@@ -14,4 +13,4 @@ class SD_OT_close_popup(BOperator.type):
         context.window.cursor_warp(10, 10)
 
         move_back = lambda: context.window.cursor_warp(x, y)
-        bpy.app.timers.register(move_back)
+        AppTimer(move_back)
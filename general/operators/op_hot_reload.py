@@ -0,0 +1,48 @@
+import traceback
+
+from ... import hot_reload
+from ...btypes import BOperator
+from ...handlers import AppTimer
+from ...keymap import register_keymap_item
+
+
+@BOperator()
+class SD_OT_hot_reload(BOperator.type):
+    """Reload only the addon modules that have changed since they were loaded, and the modules that import them"""
+
+    def execute(self, context):
+        try:
+            changed, affected = hot_reload.get_pending_changes()
+        except hot_reload.ReloadError as e:
+            self.report({"ERROR"}, f"Hot reload failed: {e}")
+            return {"CANCELLED"}
+
+        if not changed:
+            self.report({"INFO"}, "Hot reload: No modules have changed")
+            return {"CANCELLED"}
+
+        self.report({"INFO"}, f"Hot reload: Started reloading {len(affected)} modules, the result is printed to the console")
+        # Reloading can unregister this operator, so it is done after it has finished running
+        AppTimer(reload)
+
+
+def reload():
+    try:
+        result = hot_reload.reload_changed_modules()
+    except hot_reload.ReloadError as e:
+        print(f"Hot reload failed: {e}")
+        return
+    except Exception:
+        print("Hot reload failed, the addon may need to be reloaded fully:")
+        traceback.print_exc()
+        return
+    if not result.changed:
+        print("Hot reload: No modules have changed")
+        return
+    print(
+        f"Hot reload: Reloaded {len(result.reloaded)} modules and {result.classes} classes "
+        f"in {result.duration * 1000:.0f}ms. Changed: {', '.join(result.changed)}"
+    )
+
+
+register_keymap_item(SD_OT_hot_reload, key="F8", ctrl=True, shift=True)
@@ -1,4 +1,3 @@
-import webbrowser
 from pathlib import Path
 
 import bpy
@@ -11,6 +10,9 @@ from ...btypes import BOperator
 class SD_OT_open_scripts_folder(BOperator.type):
 
     def execute(self, context):
+        # Only import this when needed, as it is slow to import and rarely used
+        import webbrowser
+
         folder = Path(bpy.utils.user_resource("SCRIPTS")).parent
         webbrowser.open(folder)
 
@@ -1,10 +1,13 @@
-from bpy.app import timers
 from bpy.props import BoolProperty
 from bpy.types import Context
 
 from ...btypes import BOperator
+from ...handlers import AppTimer
 from ...keymap import register_keymap_item
 
+# The keymap items are created in a timer, so this module always needs to be imported
+__no_lazy__ = True
+
 
 @BOperator(undo=True, dynamic_description=False)
 class SD_OT_set_in_out_frame(BOperator.type):
@@ -38,6 +41,6 @@ def start():
     props.out = True
 
 
-timers.register(start)
+AppTimer(start, persistent=True)
 
 # props = register_keymap_item(SD_OT_set_in_out_frame, key="O", keymap_context="Window")
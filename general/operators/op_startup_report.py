@@ -0,0 +1,70 @@
+from bpy.props import BoolProperty, EnumProperty, IntProperty
+from bpy.types import Context, UILayout
+
+from ... import profiler
+from ...btypes import BOperator
+
+
+@BOperator()
+class SD_OT_startup_report(BOperator.type):
+    """Show how long each part of enabling the addon took"""
+
+    sort_by: EnumProperty(
+        name="Sort by",
+        items=(
+            ("self_duration", "Self time", "Sort by the time taken, not including nested entries"),
+            ("duration", "Total time", "Sort by the time taken, including nested entries"),
+            ("start", "Start", "Sort by the order the entries were recorded in"),
+            ("name", "Name", "Sort by name"),
+            ("category", "Category", "Sort by category"),
+        ),
+    )
+
+    reverse: BoolProperty(name="Reverse", default=True)
+
+    max_entries: IntProperty(name="Max entries", default=40, min=1)
+
+    def invoke(self, context, event):
+        return self.call_popup(width=700)
+
+    def draw(self, context: Context):
+        layout: UILayout = self.layout
+        row = layout.row(align=True)
+        row.prop(self, "sort_by", text="")
+        row.prop(self, "reverse", text="", icon="SORT_DESC" if self.reverse else "SORT_ASC")
+        row.prop(self, "max_entries", text="Show")
+        SD_OT_dump_startup_profile.draw_button(row, text="", icon="EXPORT")
+
+        # Totals per category
+        box = layout.box().column(align=True)
+        totals = profiler.get_totals()
+        for category, total in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+            row = box.row()
+            row.label(text=category.replace("_", " ").title())
+            row.label(text=f"{total * 1000:.2f}ms")
+        row = box.row()
+        row.label(text="Total")
+        row.label(text=f"{sum(totals.values()) * 1000:.2f}ms")
+
+        # Individual entries
+        col = layout.column(align=True)
+        row = col.row()
+        row.label(text="Name")
+        row.label(text="Category")
+        row.label(text="Self")
+        row.label(text="Total")
+        for entry in profiler.get_entries(self.sort_by, self.reverse)[: self.max_entries]:
+            row = col.box().row()
+            row.label(text=entry.name)
+            row.label(text=entry.category.replace("_", " ").title())
+            row.label(text=f"{entry.self_duration * 1000:.2f}ms")
+            row.label(text=f"{entry.duration * 1000:.2f}ms")
+
+
+@BOperator()
+class SD_OT_dump_startup_profile(BOperator.type):
+    """Write the startup profile to a json file in the addon cache directory"""
+
+    def execute(self, context):
+        path = profiler.dump_json()
+        self.report({"INFO"}, f"Saved startup profile to {path}")
@@ -0,0 +1,140 @@
+import bisect
+import json
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from .constants import Files
+
+"""Records how long the callbacks run by the handlers module take, and how often they are called.
+Timing is off by default, and can be switched on at runtime with `set_enabled`.
+When it's off, the only cost is checking the `enabled` flag before each call."""
+
+__no_reload__ = True
+
+
+class CallbackKind:
+    HANDLER = "HANDLER"
+    "A callback of a handlers.Handler"
+    DRAW = "DRAW"
+    "A callback of a handlers.DrawHandler"
+    TIMER = "TIMER"
+    "A function of a handlers.AppTimer"
+    MSGBUS = "MSGBUS"
+    "A callback of a handlers.MsgBusSubscription"
+
+
+# The number of recent calls that are kept for each callback
+RECENT_CALLS = 256
+
+# The upper bounds of the histogram buckets in seconds
+HISTOGRAM_BOUNDS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, float("inf"))
+HISTOGRAM_LABELS = ("<0.1ms", "<0.5ms", "<1ms", "<5ms", "<10ms", "<50ms", ">50ms")
+
+
+@dataclass
+class CallbackStats:
+    name: str
+    kind: str
+    calls: int = 0
+    total: float = 0
+    "The total time spent in this callback in seconds"
+    max: float = 0
+    histogram: list[int] = field(default_factory=lambda: [0] * len(HISTOGRAM_BOUNDS))
+    "The number of calls that took less than each of the HISTOGRAM_BOUNDS"
+    recent: deque[tuple[float, float]] = field(default_factory=lambda: deque(maxlen=RECENT_CALLS))
+    "The start times and durations of the most recent calls"
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.calls if self.calls else 0
+
+    @property
+    def recent_mean(self) -> float:
+        return sum(d for _, d in self.recent) / len(self.recent) if self.recent else 0
+
+    def record(self, start: float, duration: float):
+        self.calls += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        self.histogram[bisect.bisect_left(HISTOGRAM_BOUNDS, duration)] += 1
+        self.recent.append((start, duration))
+
+
+enabled = False
+start_time = time.perf_counter()
+stats: dict[str, CallbackStats] = {}
+
+
+def get_callback_name(callback: Callable) -> str:
+    module = getattr(callback, "__module__", "") or ""
+    name = getattr(callback, "__qualname__", None) or repr(callback)
+    return f"{module.rpartition('.')[2]}.{name}" if module else name
+
+
+def call_timed(kind: str, source: Callable, func: Callable, *args):
+    """Call a function and record how long it took.
+    source: The function that the timing is recorded for, which can differ from the one called (e.g. a wrapper)"""
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        duration = time.perf_counter() - start
+        name = get_callback_name(source)
+        if not (entry := stats.get(name)):
+            entry = stats[name] = CallbackStats(name, kind)
+        entry.record(start, duration)
+
+
+def set_enabled(value: bool):
+    global enabled
+    enabled = value
+
+
+def get_stats(sort_by: str = "total", reverse: bool = True, kind: str = "") -> list[CallbackStats]:
+    """Get the stats of all callbacks, sorted by one of their attributes, and optionally filtered by kind"""
+    filtered = [s for s in stats.values() if s.kind == kind] if kind else stats.values()
+    return sorted(filtered, key=lambda s: getattr(s, sort_by), reverse=reverse)
+
+
+def to_chrome_trace() -> dict:
+    """Convert the recent calls to the Chrome trace event format, which can be opened in chrome://tracing or Perfetto.
+    Each kind of callback is shown on a separate track."""
+    tracks = {CallbackKind.HANDLER: 1, CallbackKind.DRAW: 2, CallbackKind.TIMER: 3, CallbackKind.MSGBUS: 4}
+    events = []
+    for entry in stats.values():
+        for start, duration in entry.recent:
+            events.append(
+                {
+                    "name": entry.name,
+                    "cat": entry.kind,
+                    "ph": "X",
+                    "ts": (start - start_time) * 1e6,
+                    "dur": duration * 1e6,
+                    "pid": 1,
+                    "tid": tracks.get(entry.kind, 0),
+                }
+            )
+    events.sort(key=lambda e: e["ts"])
+    names = [
+        {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": kind.title()}}
+        for kind, tid in tracks.items()
+    ]
+    return {"traceEvents": names + events, "displayTimeUnit": "ms"}
+
+
+def dump_chrome_trace(path: Path | str = "") -> Path:
+    """Write the recent calls to a Chrome trace json file, and return its path.
+    The default location is in the addon cache directory"""
+    path = Path(path) if path else Files.HANDLER_TRACE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(to_chrome_trace(), f)
+    return path
+
+
+def clear():
+    stats.clear()
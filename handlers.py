@@ -1,10 +1,21 @@
 from __future__ import annotations
 
+import heapq
+import itertools
+import time
+import traceback
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import Callable
 
 import bpy
 
+from . import handler_stats
+from .handler_stats import CallbackKind
+
+# Reloading this would lose track of the handlers that have been added
+__no_reload__ = True
+
 
 class HandlerType(Enum):
     ANIMATION_PLAYBACK_POST = "animation_playback_post"
@@ -45,7 +56,77 @@ class HandlerType(Enum):
     PERSISTENT = "persistent"
 
 
-handlers: list[Handler] = []
+# All handlers that haven't been removed. Dictionaries are used as ordered sets, so adding and removing is O(1).
+handlers: dict[Handler, None] = {}
+
+
+class HandlerDispatcher:
+    """Calls all of the handlers of one type, so that only a single callback is added to bpy.app.handlers
+    for each handler type, no matter how many handlers there are.
+    The callback is added when the first handler of the type is created, and removed when the last one is removed."""
+
+    def __init__(self, handler_type: HandlerType):
+        self.handler_type = handler_type
+        self.handlers: dict[Handler, None] = {}
+        # The handlers sorted by their order, which is reset whenever they change
+        self._ordered: tuple[Handler] | None = None
+
+        # This is always persistent, handlers that aren't are removed when a file is loaded instead.
+        @bpy.app.handlers.persistent
+        def dispatch(*args):
+            self.dispatch(*args)
+
+        self.callback = dispatch
+
+    def get_ordered(self) -> tuple[Handler]:
+        if self._ordered is None:
+            self._ordered = tuple(sorted(self.handlers, key=lambda handler: handler.order))
+        return self._ordered
+
+    def dispatch(self, *args):
+        # Iterate over a copy, so that handlers can be added and removed by the callbacks
+        for handler in self.get_ordered():
+            if not handler.enabled:
+                continue
+            try:
+                if handler_stats.enabled:
+                    handler_stats.call_timed(CallbackKind.HANDLER, handler.callback, handler.run, *args)
+                else:
+                    handler.run(*args)
+            except Exception:
+                # Match Blender, where an error in one handler doesn't stop the others from running
+                traceback.print_exc()
+
+    def add(self, handler: Handler):
+        if not self.handlers:
+            getattr(bpy.app.handlers, self.handler_type.value).append(self.callback)
+        self.handlers[handler] = None
+        self._ordered = None
+
+    def remove(self, handler: Handler):
+        self.handlers.pop(handler, None)
+        self._ordered = None
+        if not self.handlers:
+            handler_list: list = getattr(bpy.app.handlers, self.handler_type.value)
+            if self.callback in handler_list:
+                handler_list.remove(self.callback)
+
+
+dispatchers: dict[HandlerType, HandlerDispatcher] = {}
+
+
+@dataclass
+class CoalescedUpdate:
+    """The updates that have been merged into a single call of a debounced or throttled handler"""
+
+    count: int = 0
+    "The number of times the handler was triggered"
+    scene: bpy.types.Scene | None = None
+    "The scene from the most recent update"
+    frame: int | None = None
+    "The current frame of the scene at the most recent update"
+    ids: dict[int, bpy.types.ID] = field(default_factory=dict)
+    "The original data blocks that were updated by the depsgraph, keyed by their session_uid"
 
 
 class Handler:
@@ -55,26 +136,185 @@ class Handler:
     This is safer than using the built in functions, as if a handler is not removed when the addon is unregistered,
     it will persist until Blender is closed.
     This is not a problem when using this class as all draw handlers created by it are removed automatically.
+
+    Args:
+        order: Handlers of the same type are called from lowest to highest order, then in the order they were added.
+        group: A name used to enable, disable or remove related handlers all at once.
+        debounce: Wait until the handler hasn't been triggered for this many seconds before calling the callback.
+        throttle: Call the callback at most this many times per second.
+            If debounce is also set, this is the minimum rate at which the callback is called while being triggered.
+
+    When debounce or throttle are set, the callback is called from a timer with a single `CoalescedUpdate` argument,
+    containing all of the data blocks updated since it was last called, rather than being called for every update.
     """
 
-    def __init__(self, callback: Callable, handler_type: HandlerType, persistent=False):
-        if persistent:
-            callback = bpy.app.handlers.persistent(callback)
+    def __init__(
+        self,
+        callback: Callable,
+        handler_type: HandlerType,
+        persistent=False,
+        order: int = 0,
+        group: str = "",
+        debounce: float = 0,
+        throttle: float = 0,
+    ):
         self.callback = callback
         self.handler_type = handler_type
-
-        handler_list: list = getattr(bpy.app.handlers, handler_type.value)
-        handler_list.append(callback)
+        self.persistent = persistent
+        self.order = order
+        self.group = group
+        self.enabled = True
+
+        self.debounce = debounce
+        self.throttle = throttle
+        self.pending: CoalescedUpdate | None = None
+        self._timer: AppTimer | None = None
+        self._first_trigger = 0
+        self._last_trigger = 0
+        self._last_call = 0
+        if debounce or throttle:
+            self.run = self._trigger
+            _add_undo_cleanup()
+
+        if not persistent:
+            _add_load_cleanup()
+
+        if not (dispatcher := dispatchers.get(handler_type)):
+            dispatcher = dispatchers[handler_type] = HandlerDispatcher(handler_type)
+        dispatcher.add(self)
 
         global handlers
-        handlers.append(self)
+        handlers[self] = None
+
+    def run(self, *args):
+        self.callback(*args)
 
     def remove(self):
-        handler_list: list = getattr(bpy.app.handlers, self.handler_type.value)
-        handler_list.remove(self.callback)
+        if dispatcher := dispatchers.get(self.handler_type):
+            dispatcher.remove(self)
+        if self._timer:
+            self._timer.remove()
+            self._timer = None
+        self.pending = None
 
         global handlers
-        handlers.remove(self)
+        handlers.pop(self, None)
+
+    def set_order(self, order: int):
+        self.order = order
+        dispatchers[self.handler_type]._ordered = None
+
+    def _trigger(self, scene=None, depsgraph=None, *args):
+        """Add the update to the pending updates, and make sure that a timer will call the callback"""
+        now = time.perf_counter()
+        if not self.pending:
+            self.pending = CoalescedUpdate()
+            self._first_trigger = now
+        self._last_trigger = now
+
+        pending = self.pending
+        pending.count += 1
+        if isinstance(scene, bpy.types.Scene):
+            pending.scene = scene
+            pending.frame = scene.frame_current
+        if isinstance(depsgraph, bpy.types.Depsgraph):
+            for update in depsgraph.updates:
+                id = update.id.original
+                pending.ids[id.session_uid] = id
+
+        if not self._timer:
+            self._timer = AppTimer(self._flush, first_interval=max(self._get_call_time() - now, 0))
+
+    def _get_call_time(self) -> float:
+        """Get the time at which the pending updates should be passed to the callback"""
+        if self.debounce:
+            call_time = self._last_trigger + self.debounce
+            if self.throttle:
+                call_time = min(call_time, self._first_trigger + 1 / self.throttle)
+            return call_time
+        return max(self._last_call + 1 / self.throttle, self._first_trigger)
+
+    def _flush(self):
+        if not self.pending:
+            self._timer = None
+            return None
+
+        # Wait longer if the handler has been triggered again since the timer was started
+        remaining = self._get_call_time() - time.perf_counter()
+        if remaining > 0:
+            return remaining
+
+        self._timer = None
+        pending, self.pending = self.pending, None
+        self._last_call = time.perf_counter()
+        if self.enabled:
+            self.callback(pending)
+        return None
+
+    def clear_pending(self):
+        """Discard the pending updates, without calling the callback"""
+        self.pending = None
+
+
+def get_handlers(handler_type: HandlerType | None = None, group: str = "") -> list[Handler]:
+    """Get all handlers, optionally only those of a specific type or group"""
+    if handler_type:
+        found = dispatchers[handler_type].handlers if handler_type in dispatchers else ()
+    else:
+        found = handlers
+    return [handler for handler in found if not group or handler.group == group]
+
+
+def set_handlers_enabled(enabled: bool, handler_type: HandlerType | None = None, group: str = ""):
+    """Enable or disable all handlers, optionally only those of a specific type or group.
+    Disabled handlers stay registered, but aren't called until they are enabled again."""
+    for handler in get_handlers(handler_type, group):
+        handler.enabled = enabled
+
+
+def remove_handlers(handler_type: HandlerType | None = None, group: str = ""):
+    for handler in get_handlers(handler_type, group):
+        handler.remove()
+
+
+@bpy.app.handlers.persistent
+def _remove_non_persistent_handlers(*args):
+    """Blender removes non persistent handlers and timers when a new file is loaded,
+    so the same needs to be done for handlers that go through a dispatcher, timers run by the scheduler,
+    and msgbus subscriptions."""
+    for handler in list(handlers):
+        if not handler.persistent:
+            handler.remove()
+    for timer in list(app_timers):
+        if not timer.persistent:
+            timer.remove()
+    for subscription in list(msgbus_subscriptions):
+        if not subscription.persistent:
+            # The subscription has already been cleared by Blender
+            subscription.subscribed = False
+            subscription.remove()
+
+
+@bpy.app.handlers.persistent
+def _clear_pending_updates(*args):
+    """The data blocks in pending updates become invalid when the file is changed by undo, redo or loading"""
+    for handler in handlers:
+        if handler.pending:
+            handler.clear_pending()
+
+
+def _add_undo_cleanup():
+    for handler_type in (HandlerType.UNDO_PRE, HandlerType.REDO_PRE, HandlerType.LOAD_PRE):
+        handler_list: list = getattr(bpy.app.handlers, handler_type.value)
+        if _clear_pending_updates not in handler_list:
+            handler_list.append(_clear_pending_updates)
+
+
+def _add_load_cleanup():
+    # This needs to be called before any load_post handlers, as Blender would already have removed them
+    load_post: list = bpy.app.handlers.load_post
+    if _remove_non_persistent_handlers not in load_post:
+        load_post.insert(0, _remove_non_persistent_handlers)
 
 
 class DrawType(Enum):
@@ -118,32 +358,245 @@ class DrawHandler:
         draw_type: DrawType = DrawType.POST_PIXEL,
         args: tuple = (),
     ):
+        def draw(*args):
+            if handler_stats.enabled:
+                handler_stats.call_timed(CallbackKind.DRAW, func, func, *args)
+            else:
+                func(*args)
+
         self.handler = space.draw_handler_add(
-            func,
+            draw,
             tuple(args),
             region_type.value,
             draw_type.value,
         )
+        self.func = func
         self.space = space
         self.region_type = region_type
 
         global draw_handlers
-        draw_handlers.append(self)
+        draw_handlers[self] = None
 
     def remove(self):
+        global draw_handlers
+        if self not in draw_handlers:
+            return
         self.space.draw_handler_remove(self.handler, self.region_type.value)
+        del draw_handlers[self]
 
-        global draw_handlers
-        draw_handlers.remove(self)
 
+draw_handlers: dict[DrawHandler, None] = {}
+
+
+class MsgBusSubscription:
+    """
+    Instantiate to call a function whenever a specific RNA property changes, using bpy.msgbus.
+    This is much cheaper than a depsgraph handler when only a single property matters.
+
+    Args:
+        key: What to subscribe to. This can be a property of a specific data block,
+            e.g. `material.path_resolve("diffuse_color", False)`, or of all instances of a type,
+            e.g. `(bpy.types.RenderSettings, "resolution_x")`, or `(bpy.types.Nodes, "active")`.
+            Keys for specific data blocks become invalid when a new file is loaded,
+            so for persistent subscriptions a function that returns the key can be given instead,
+            which is called again each time the subscription is renewed.
+            If it returns None, the subscription is skipped until the next file is loaded.
+        persistent: Keep the subscription when a new file is loaded.
+            Blender clears all msgbus subscriptions on load, so persistent ones are automatically subscribed again.
+        args: Arguments to pass to the callback.
+
+    Like handlers, all subscriptions created with this class are removed automatically when the addon is unregistered.
+    """
+
+    def __init__(self, key: tuple | Callable, callback: Callable, persistent: bool = False, args: tuple = ()):
+        self.key = key
+        self.callback = callback
+        self.persistent = persistent
+        self.args = tuple(args)
+        self.subscribed = False
+        if not persistent:
+            _add_load_cleanup()
+        _add_msgbus_renewal()
+        self.subscribe()
+
+        global msgbus_subscriptions
+        msgbus_subscriptions[self] = None
+
+    def run(self, *args):
+        if handler_stats.enabled:
+            handler_stats.call_timed(CallbackKind.MSGBUS, self.callback, self.callback, *args)
+        else:
+            self.callback(*args)
+
+    def subscribe(self):
+        """Subscribe to the key, first resolving it if it is a function"""
+        key = self.key() if callable(self.key) else self.key
+        if key is None:
+            return
+        # The subscription itself is the owner, so that it can be cleared without affecting any others
+        bpy.msgbus.subscribe_rna(key=key, owner=self, args=self.args, notify=self.run)
+        self.subscribed = True
 
-draw_handlers: list[DrawHandler] = []
+    def remove(self):
+        global msgbus_subscriptions
+        if self not in msgbus_subscriptions:
+            return
+        if self.subscribed:
+            bpy.msgbus.clear_by_owner(self)
+            self.subscribed = False
+        del msgbus_subscriptions[self]
+
+
+msgbus_subscriptions: dict[MsgBusSubscription, None] = {}
+
+
+@bpy.app.handlers.persistent
+def _renew_msgbus_subscriptions(*args):
+    """Blender clears all msgbus subscriptions when a file is loaded, so subscribe the persistent ones again"""
+    for subscription in msgbus_subscriptions:
+        subscription.subscribed = False
+        try:
+            subscription.subscribe()
+        except Exception:
+            traceback.print_exc()
+
+
+def _add_msgbus_renewal():
+    load_post: list = bpy.app.handlers.load_post
+    if _renew_msgbus_subscriptions not in load_post:
+        load_post.append(_renew_msgbus_subscriptions)
+
+
+app_timers: dict[AppTimer, None] = {}
+
+
+@dataclass
+class SchedulerStats:
+    ticks: int = 0
+    "The number of times the scheduler has run"
+    calls: int = 0
+    "The number of times timer functions have been called"
+    backlog: int = 0
+    "The number of timers that were due, but were left for the next tick because the time budget was used up"
+    max_backlog: int = 0
+    over_budget_ticks: int = 0
+    "The number of ticks where there were more due timers than could be run within the time budget"
+    last_lateness: float = 0
+    "How many seconds after it was due the last timer was called"
+    max_lateness: float = 0
+    total_lateness: float = 0
+
+    @property
+    def mean_lateness(self) -> float:
+        return self.total_lateness / self.calls if self.calls else 0
+
+    def summary(self) -> str:
+        return (
+            f"{self.ticks} ticks, {self.calls} calls, backlog {self.backlog} (max {self.max_backlog}), "
+            f"{self.over_budget_ticks} ticks over budget, lateness mean {self.mean_lateness * 1000:.2f}ms "
+            f"max {self.max_lateness * 1000:.2f}ms"
+        )
 
 
-app_timers: list[AppTimer] = []
+class Scheduler:
+    """Runs all AppTimers from a single Blender timer, so that many timers only cost one callback per tick.
+    Timers are kept in a heap ordered by the time they are next due.
+    Each tick runs as many due timers as fit within the time budget, and leaves the rest for the next tick,
+    so that lots of timers being due at once can't freeze the UI."""
+
+    def __init__(self, budget: float = 0.005):
+        self.budget = budget
+        "The maximum number of seconds to spend running timers in a single tick (at least one is always run)"
+        self.queue: list[tuple[float, int, AppTimer]] = []
+        self.stats = SchedulerStats()
+        # Used to break ties between timers that are due at the same time, so that they run in the order they were added
+        self._counter = itertools.count()
+        # The time that the Blender timer will next run at, or None if it isn't registered
+        self._next_tick: float | None = None
+
+    def add(self, timer: AppTimer, interval: float):
+        due = time.perf_counter() + interval
+        heapq.heappush(self.queue, (due, next(self._counter), timer))
+
+        if self._next_tick is None or due < self._next_tick:
+            # Run the Blender timer earlier
+            if bpy.app.timers.is_registered(_tick):
+                bpy.app.timers.unregister(_tick)
+            bpy.app.timers.register(_tick, first_interval=interval, persistent=True)
+            self._next_tick = due
+
+    def tick(self) -> float | None:
+        """Run the due timers, and return the time until the Blender timer should next run"""
+        start = time.perf_counter()
+        stats = self.stats
+        stats.ticks += 1
+        queue = self.queue
+
+        ran = 0
+        while queue and queue[0][0] <= start:
+            if ran and time.perf_counter() - start > self.budget:
+                break
+            due, _, timer = heapq.heappop(queue)
+            if timer.finished:
+                continue
+
+            lateness = time.perf_counter() - due
+            stats.calls += 1
+            stats.last_lateness = lateness
+            stats.total_lateness += lateness
+            stats.max_lateness = max(stats.max_lateness, lateness)
+            ran += 1
+
+            try:
+                if handler_stats.enabled:
+                    interval = handler_stats.call_timed(CallbackKind.TIMER, timer.func, timer.run)
+                else:
+                    interval = timer.run()
+            except Exception:
+                # Match Blender, which stops timers that raise an error
+                traceback.print_exc()
+                interval = None
+
+            if interval is None:
+                timer.remove()
+            elif not timer.finished:
+                heapq.heappush(queue, (time.perf_counter() + interval, next(self._counter), timer))
+
+        stats.backlog = sum(1 for due, _, timer in queue if due <= start and not timer.finished)
+        if stats.backlog:
+            stats.over_budget_ticks += 1
+            stats.max_backlog = max(stats.max_backlog, stats.backlog)
+
+        # Drop removed timers from the front of the queue, so that the Blender timer isn't run for nothing
+        while queue and queue[0][2].finished:
+            heapq.heappop(queue)
+
+        if not queue:
+            self._next_tick = None
+            return None
+        interval = max(queue[0][0] - time.perf_counter(), 0)
+        self._next_tick = time.perf_counter() + interval
+        return interval
+
+    def clear(self):
+        self.queue.clear()
+        self._next_tick = None
+        if bpy.app.timers.is_registered(_tick):
+            bpy.app.timers.unregister(_tick)
+
+
+scheduler = Scheduler()
+
+
+def _tick():
+    return scheduler.tick()
 
 
 class AppTimer:
+    """Call a function after first_interval seconds, then again after the number of seconds that it returns,
+    until it returns None or the timer is removed.
+    This works like bpy.app.timers.register, but all timers are run by the scheduler from a single Blender timer."""
+
     def run(self):
         if not self.finished:
             return self.func()
@@ -151,27 +604,65 @@ class AppTimer:
     def __init__(self, func: Callable, first_interval: float = 0, persistent: bool = False):
         self.finished = False
         self.func = func
-        bpy.app.timers.register(self.run, first_interval=first_interval, persistent=persistent)
+        self.persistent = persistent
+        if not persistent:
+            _add_load_cleanup()
+        scheduler.add(self, first_interval)
         global app_timers
-        app_timers.append(self)
+        app_timers[self] = None
 
     def remove(self):
+        # The timer is removed from the scheduler queue the next time it would be run
         self.finished = True
 
         global app_timers
-        app_timers.remove(self)
+        app_timers.pop(self, None)
+
+
+def remove_module_handlers(module_names: set[str]):
+    """Remove all handlers, draw handlers, timers and msgbus subscriptions with callbacks defined in the given modules"""
+    for handler in list(handlers):
+        if getattr(handler.callback, "__module__", None) in module_names:
+            handler.remove()
+
+    for handler in list(draw_handlers):
+        if getattr(handler.func, "__module__", None) in module_names:
+            handler.remove()
+
+    for timer in list(app_timers):
+        if getattr(timer.func, "__module__", None) in module_names:
+            timer.remove()
+
+    for subscription in list(msgbus_subscriptions):
+        if getattr(subscription.callback, "__module__", None) in module_names:
+            subscription.remove()
 
 
 def unregister():
     """Clean up unremoved handlers"""
+    # Iterate over copies, as removing modifies the registries
     global handlers
-    for handler in handlers:
+    for handler in list(handlers):
         handler.remove()
+    dispatchers.clear()
+    if _remove_non_persistent_handlers in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_remove_non_persistent_handlers)
+    for handler_type in (HandlerType.UNDO_PRE, HandlerType.REDO_PRE, HandlerType.LOAD_PRE):
+        handler_list: list = getattr(bpy.app.handlers, handler_type.value)
+        if _clear_pending_updates in handler_list:
+            handler_list.remove(_clear_pending_updates)
 
     global draw_handlers
-    for handler in draw_handlers:
+    for handler in list(draw_handlers):
         handler.remove()
 
     global app_timers
-    for timer in app_timers:
+    for timer in list(app_timers):
         timer.remove()
+    scheduler.clear()
+
+    global msgbus_subscriptions
+    for subscription in list(msgbus_subscriptions):
+        subscription.remove()
+    if _renew_msgbus_subscriptions in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_renew_msgbus_subscriptions)
@@ -0,0 +1,224 @@
+import importlib
+import inspect
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import ModuleType
+
+import bpy
+
+from . import auto_load, btypes, handlers, keymap
+
+"""Reload only the submodules that have changed since they were loaded, along with the modules that import them.
+Only the classes, keymap items, handlers and menu entries belonging to those modules are unregistered and
+registered again, rather than reloading the whole addon.
+
+Modules that hold state which can't be recreated can set `__no_reload__ = True`.
+If one of them changes, Blender needs to be restarted instead."""
+
+__no_reload__ = True
+
+
+class ReloadError(Exception):
+    """Raised when the changes can't be hot reloaded"""
+
+
+@dataclass
+class ReloadResult:
+    changed: list[str] = field(default_factory=list)
+    "The modules whose source files have changed"
+    reloaded: list[str] = field(default_factory=list)
+    "All modules that were reloaded, in the order they were reloaded in"
+    classes: int = 0
+    "The number of classes that were registered again"
+    duration: float = 0
+    "The time taken in seconds"
+
+
+def get_package_prefix() -> str:
+    return __package__ + "."
+
+
+def get_module_name(path: str) -> str:
+    """Get the full module name from a path relative to the addon directory"""
+    parts = path.removesuffix(".py").split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return get_package_prefix() + ".".join(parts) if parts else __package__
+
+
+def get_changed_modules(old_files: dict, new_files: dict) -> set[str]:
+    """Get the names of the modules that have been changed or added between two snapshots of the source files"""
+    if removed := set(old_files) - set(new_files):
+        raise ReloadError(f"Files have been removed, so the addon needs to be reloaded fully: {sorted(removed)}")
+    skipped = {get_package_prefix() + name for name in auto_load.SKIPPED_MODULES}
+    changed = {get_module_name(path) for path, stat in new_files.items() if old_files.get(path) != stat}
+    return changed - skipped
+
+
+def compile_changed_files(directory: Path, old_files: dict, new_files: dict):
+    """Compile the files that have changed, so that syntax errors are found before anything is unregistered"""
+    for path, stat in new_files.items():
+        if old_files.get(path) == stat:
+            continue
+        file = directory / path
+        try:
+            compile(file.read_text(encoding="utf-8"), str(file), "exec")
+        except (SyntaxError, ValueError, OSError) as e:
+            raise ReloadError(f"{path} can't be compiled: {e}") from e
+
+
+def get_loaded_modules() -> dict[str, ModuleType]:
+    prefix = get_package_prefix()
+    return {name: module for name, module in sys.modules.items() if name.startswith(prefix)}
+
+
+def iter_module_imports(module: ModuleType, loaded_modules: dict[str, ModuleType]):
+    """Find the names of the other submodules that this module imports modules, classes or functions from"""
+    for value in list(module.__dict__.values()):
+        if isinstance(value, ModuleType):
+            name = value.__name__
+        elif inspect.isclass(value) or inspect.isfunction(value):
+            name = value.__module__
+        else:
+            continue
+        if name != module.__name__ and name in loaded_modules:
+            yield name
+
+
+def get_dependents(loaded_modules: dict[str, ModuleType]) -> dict[str, set[str]]:
+    """Get the names of the modules that import each module"""
+    dependents = {name: set() for name in loaded_modules}
+    for name, module in loaded_modules.items():
+        for dependency in iter_module_imports(module, loaded_modules):
+            dependents[dependency].add(name)
+    return dependents
+
+
+def get_affected_modules(changed: set[str], loaded_modules: dict[str, ModuleType]) -> set[str]:
+    """Get the changed modules and all of the modules that depend on them, directly or indirectly"""
+    for name in changed:
+        if name == __package__ or getattr(loaded_modules.get(name), "__no_reload__", False):
+            raise ReloadError(f"{name} can't be hot reloaded, Blender needs to be restarted")
+
+    dependents = get_dependents(loaded_modules)
+    affected = set()
+    to_check = list(changed)
+    while to_check:
+        name = to_check.pop()
+        if name in affected:
+            continue
+        affected.add(name)
+        for dependent in dependents.get(name, ()):
+            # A module that isn't reloaded would keep using the old versions of the things it imports
+            if getattr(loaded_modules.get(dependent), "__no_reload__", False):
+                raise ReloadError(
+                    f"{dependent} imports from {name}, but can't be hot reloaded, Blender needs to be restarted"
+                )
+            to_check.append(dependent)
+    return affected
+
+
+def get_reload_order(affected: set[str], loaded_modules: dict[str, ModuleType]) -> list[str]:
+    """Order the modules so that each one is reloaded after the modules that it imports"""
+    deps_dict = {}
+    for name in sorted(affected):
+        module = loaded_modules.get(name)
+        deps_dict[name] = set(iter_module_imports(module, loaded_modules)) & affected if module else set()
+    try:
+        return auto_load.toposort(deps_dict)
+    except ValueError:
+        # Circular imports, so there is no correct order
+        return sorted(affected)
+
+
+def get_pending_changes() -> tuple[set[str], set[str]]:
+    """Get the modules that have changed since the addon was loaded, and all of the modules that would be reloaded.
+    Raises ReloadError if the changes can't be hot reloaded."""
+    directory = Path(auto_load.__file__).parent
+    new_files = auto_load.get_source_files(directory)
+    changed = get_changed_modules(auto_load.source_files, new_files)
+    if not changed:
+        return changed, set()
+    compile_changed_files(directory, auto_load.source_files, new_files)
+    return changed, get_affected_modules(changed, get_loaded_modules())
+
+
+def reload_changed_modules() -> ReloadResult:
+    """Reload the modules that have changed since the addon was loaded, and the modules that depend on them.
+    Raises ReloadError before anything is unregistered if the changes can't be hot reloaded."""
+    start = time.perf_counter()
+    directory = Path(auto_load.__file__).parent
+    new_files = auto_load.get_source_files(directory)
+    loaded_modules = get_loaded_modules()
+    changed = get_changed_modules(auto_load.source_files, new_files)
+    if not changed:
+        return ReloadResult()
+
+    compile_changed_files(directory, auto_load.source_files, new_files)
+    affected = get_affected_modules(changed, loaded_modules)
+    order = get_reload_order(affected, loaded_modules)
+    # If btypes is reloaded, its own register functions handle the property groups
+    handle_property_groups = btypes.__name__ not in affected
+
+    # Unregister
+    for name in reversed(order):
+        module = loaded_modules.get(name)
+        if module in auto_load.modules and hasattr(module, "unregister"):
+            module.unregister()
+
+    if handle_property_groups:
+        for pgroup in btypes.property_groups.copy():
+            if pgroup.cls.__module__ in affected:
+                pgroup._unregister()
+                btypes.property_groups.remove(pgroup)
+
+    for cls in reversed(auto_load.ordered_classes.copy()):
+        if cls.__module__ in affected:
+            if getattr(cls, "is_registered", False):
+                bpy.utils.unregister_class(cls)
+            auto_load.ordered_classes.remove(cls)
+
+    keymap.remove_module_keymap_items(affected)
+    handlers.remove_module_handlers(affected)
+
+    # Reload
+    modules = []
+    for name in order:
+        if name in sys.modules:
+            modules.append(importlib.reload(sys.modules[name]))
+        else:
+            # Added modules, and lazily loaded modules that haven't been imported yet
+            modules.append(importlib.import_module(name))
+
+    # Register again
+    classes = [
+        cls
+        for cls in auto_load.get_ordered_classes_to_register(modules)
+        if cls.__module__ in affected and not getattr(cls, "__no_reg__", False)
+    ]
+    for cls in classes:
+        bpy.utils.register_class(cls)
+    auto_load.ordered_classes.extend(classes)
+
+    if handle_property_groups:
+        for pgroup in btypes.property_groups:
+            if pgroup.cls.__module__ in affected:
+                pgroup._register()
+
+    for module in modules:
+        if getattr(module, "__no_reg__", False):
+            continue
+        if module not in auto_load.modules:
+            auto_load.modules.append(module)
+        if hasattr(module, "register"):
+            module.register()
+
+    auto_load.source_files = new_files
+    return ReloadResult(
+        changed=sorted(changed),
+        reloaded=order,
+        classes=len(classes),
+        duration=time.perf_counter() - start,
+    )
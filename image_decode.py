@@ -0,0 +1,185 @@
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+"""Decoding and downscaling images with numpy, without going through bpy.data.images.
+None of this touches blender data, so it can be run in a worker thread."""
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# The number of channels for each PNG color type
+PNG_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}
+
+
+class UnsupportedImageError(Exception):
+    """Raised when an image can't be decoded here, and needs to be loaded by blender instead"""
+
+
+def read_png_size(path: Path) -> tuple[int, int]:
+    """Read the width and height of a PNG from its header, without decoding it"""
+    with open(path, "rb") as f:
+        header = f.read(24)
+    if header[:8] != PNG_SIGNATURE or header[12:16] != b"IHDR":
+        raise UnsupportedImageError(f"{path} is not a PNG")
+    return struct.unpack(">II", header[16:24])
+
+
+def unfilter_scanlines(data: np.ndarray, height: int, stride: int, bpp: int) -> np.ndarray:
+    """Reverse the filter that is applied to each row of a PNG"""
+    rows = data.reshape(height, stride + 1)
+    filters = rows[:, 0]
+    rows = rows[:, 1:]
+    if filters.max(initial=0) > 4:
+        raise UnsupportedImageError(f"Unknown PNG filter type {filters.max()}")
+    if (filters >= 3).any():
+        return unfilter_diagonals(rows, filters, bpp)
+
+    # None of these filters depend on the pixel to the left after being reversed, so each row is a few numpy calls
+    out = np.empty((height, stride), dtype=np.uint8)
+    prev = np.zeros(stride, dtype=np.uint8)
+    for y in range(height):
+        row = rows[y]
+        filter_type = filters[y]
+        if filter_type == 0:
+            out[y] = row
+        elif filter_type == 1:
+            # Each byte adds the byte one pixel to the left, which is a running sum per channel
+            out[y] = np.cumsum(row.reshape(-1, bpp), axis=0, dtype=np.uint8).reshape(-1)
+        else:
+            out[y] = row + prev
+        prev = out[y]
+    return out
+
+
+def unfilter_diagonals(rows: np.ndarray, filters: np.ndarray, bpp: int) -> np.ndarray:
+    """Reverse any mix of PNG filters, including Average and Paeth, which depend on the reversed pixel to the left.
+    Each pixel only depends on the pixels to the left, above and above left of it, so all of the pixels on a
+    diagonal can be reversed together once the previous diagonals are done, taking width + height numpy steps."""
+    height = rows.shape[0]
+    width = rows.shape[1] // bpp
+    filtered = rows.reshape(height * width, bpp)
+    # Padded with a row above and a column to the left, so that the edges read zeros like the PNG spec says
+    padded_width = width + 1
+    recon = np.zeros(((height + 1) * padded_width, bpp), dtype=np.uint8)
+
+    for diagonal in range(width + height - 1):
+        ys = np.arange(max(0, diagonal - width + 1), min(diagonal, height - 1) + 1)
+        xs = diagonal - ys
+        index = (ys + 1) * padded_width + xs + 1
+        a = recon[index - 1].astype(np.int16)
+        b = recon[index - padded_width].astype(np.int16)
+        c = recon[index - padded_width - 1].astype(np.int16)
+
+        # Paeth picks whichever of a, b and c is closest to a + b - c
+        pa, pb, pc = np.abs(b - c), np.abs(a - c), np.abs(a + b - 2 * c)
+        paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+        predictor = np.choose(filters[ys, None], (0, a, b, (a + b) >> 1, paeth))
+        recon[index] = (filtered[ys * width + xs] + predictor) & 255
+
+    return recon.reshape(height + 1, padded_width * bpp)[1:, bpp:]
+
+
+def decode_png(path: Path) -> np.ndarray:
+    """Decode an 8 bit, non interlaced PNG into a uint8 array of shape (height, width, channels),
+    with the first row at the top."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:8] != PNG_SIGNATURE:
+        raise UnsupportedImageError(f"{path} is not a PNG")
+
+    pos = 8
+    header = None
+    chunks = []
+    while pos < len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos : pos + 8])
+        chunk = data[pos + 8 : pos + 8 + length]
+        pos += length + 12
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif chunk_type == b"IDAT":
+            chunks.append(chunk)
+        elif chunk_type == b"IEND":
+            break
+
+    if header is None:
+        raise UnsupportedImageError(f"{path} has no header")
+    width, height, bit_depth, color_type, _, _, interlace = header
+    if bit_depth != 8 or color_type not in PNG_CHANNELS or interlace:
+        raise UnsupportedImageError(f"{path} uses an unsupported PNG format")
+
+    channels = PNG_CHANNELS[color_type]
+    raw = np.frombuffer(zlib.decompress(b"".join(chunks)), dtype=np.uint8)
+    return unfilter_scanlines(raw, height, width * channels, channels).reshape(height, width, channels)
+
+
+def to_rgba(pixels: np.ndarray) -> np.ndarray:
+    """Convert an image with 1 to 4 channels in the 0-255 range into a float32 RGBA array in the 0-1 range"""
+    channels = pixels.shape[2]
+    rgba = np.empty(pixels.shape[:2] + (4,), dtype=np.float32)
+    if channels <= 2:
+        rgba[..., :3] = pixels[..., :1]
+    else:
+        rgba[..., :3] = pixels[..., :3]
+    rgba[..., 3] = pixels[..., -1] if channels in {2, 4} else 255
+    rgba /= 255
+    return rgba
+
+
+def get_thumbnail_size(size: tuple[int, int], max_size: tuple[int, int]) -> tuple[int, int]:
+    """Get the size of an image scaled down to fit inside max_size, keeping its aspect ratio"""
+    scale = min(max_size[0] / size[0], max_size[1] / size[1], 1)
+    return max(int(size[0] * scale), 1), max(int(size[1] * scale), 1)
+
+
+def downscale_box(pixels: np.ndarray, size: tuple[int, int]) -> np.ndarray:
+    """Shrink an image to the given (width, height) by averaging the pixels that cover each output pixel.
+    The largest whole number factor is done by averaging blocks, and any remainder by averaging the covered areas.
+    The blocks are summed straight from the source array, so a uint8 image is never copied at full size."""
+    height, width = pixels.shape[:2]
+    new_width, new_height = size
+    factor_x, factor_y = width // new_width, height // new_height
+
+    if factor_x > 1 or factor_y > 1:
+        height, width = height // factor_y * factor_y, width // factor_x * factor_x
+        blocks = pixels[:height, :width].reshape(height // factor_y, factor_y, width // factor_x, factor_x, -1)
+        pixels = blocks.mean(axis=(1, 3), dtype=np.float32)
+        height, width = pixels.shape[:2]
+
+    if (width, height) != (new_width, new_height):
+        pixels = resample_area(pixels, new_height, axis=0)
+        pixels = resample_area(pixels, new_width, axis=1)
+    return pixels.astype(np.float32)
+
+
+def resample_area(pixels: np.ndarray, new_length: int, axis: int) -> np.ndarray:
+    """Resize one axis of an image by weighting each source pixel by how much of it each output pixel covers"""
+    length = pixels.shape[axis]
+    if length == new_length:
+        return pixels
+    edges = np.linspace(0, length, new_length + 1)
+    # Integrate the pixels, so that the sum over any span can be found by interpolating at its edges
+    cumulative = np.concatenate([np.zeros_like(np.take(pixels, [0], axis=axis)), np.cumsum(pixels, axis=axis)], axis)
+    moved = np.moveaxis(cumulative, axis, 0)
+    flat = moved.reshape(length + 1, -1)
+    # Linearly interpolate the integral at each edge
+    indices = np.minimum(edges.astype(np.int64), length - 1)
+    fractions = (edges - indices)[:, None]
+    sums = flat[indices] + fractions * (flat[indices + 1] - flat[indices])
+    averages = np.diff(sums, axis=0) / np.diff(edges)[:, None]
+    return np.moveaxis(averages.reshape((new_length,) + moved.shape[1:]), 0, axis)
+
+
+def load_thumbnail(path: Path, max_size: tuple[int, int]) -> np.ndarray:
+    """Decode a PNG, shrink it to fit inside max_size, and convert it to linear colors.
+    The image is shrunk while it still has its original channels, before it is expanded to float RGBA."""
+    pixels = decode_png(path)
+    size = get_thumbnail_size((pixels.shape[1], pixels.shape[0]), max_size)
+    return srgb_to_linear(to_rgba(downscale_box(pixels, size)))
+
+
+def srgb_to_linear(pixels: np.ndarray) -> np.ndarray:
+    """Convert the color channels of an RGBA image from sRGB to linear, to match the textures blender creates"""
+    rgb = pixels[..., :3]
+    pixels[..., :3] = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    return pixels
@@ -4,10 +4,19 @@ import bpy
 from bpy.types import KeyMap, KeyMapItem, KeyMapItems
 
 from .btypes import BOperatorBase
+from .profiler import ProfileCategory, profile
+
+# Reloading this would lose track of the keymap items that have been created
+__no_reload__ = True
 
 addon_keymaps = []
 keymaps: dict[str, KeyMap] = {}
 
+# All keymap items created with register_keymap_item, keyed by the arguments they were created with.
+keymap_items: dict[tuple, KeyMapItem] = {}
+# The module that defines the operator of each keymap item, if it is known.
+keymap_item_modules: dict[tuple, str] = {}
+
 
 T = TypeVar("T", bound=BOperatorBase)
 
@@ -24,22 +33,75 @@ def register_keymap_item(
 ) -> Union[T, KeyMapItem]:
     """Create a new keymap item.
     Returns the new keymap item properties, which can be used to set the properties that the operator can be called with
+    If an identical keymap item has already been created, the properties of that item are returned instead.
     """
-    global keymaps
-    km = keymaps.get(keymap_context)
-
-    # global km
-    if not km:
-        addon = bpy.context.window_manager.keyconfigs.addon
-        km = addon.keymaps.new(name=keymap_context)
     idname = operator if isinstance(operator, str) else operator.bl_idname
+    item_key = (idname, key, value, shift, ctrl, alt, oskey, keymap_context)
+    if not isinstance(operator, str):
+        keymap_item_modules[item_key] = operator.__module__
+
+    if kmi := keymap_items.get(item_key):
+        return kmi.properties
+
+    with profile(ProfileCategory.SIDE_EFFECT, f"Keymap item {idname}"):
+        global keymaps
+        km = keymaps.get(keymap_context)
+
+        # global km
+        if not km:
+            addon = bpy.context.window_manager.keyconfigs.addon
+            km = addon.keymaps.new(name=keymap_context)
+            keymaps[keymap_context] = km
 
-    keymap_items: KeyMapItems = km.keymap_items
-    kmi = keymap_items.new(idname=idname, type=key, value=value, shift=shift, ctrl=ctrl, alt=alt, oskey=oskey)
-    addon_keymaps.append((km))
+        km_items: KeyMapItems = km.keymap_items
+        kmi = km_items.new(idname=idname, type=key, value=value, shift=shift, ctrl=ctrl, alt=alt, oskey=oskey)
+        addon_keymaps.append((km))
+
+    keymap_items[item_key] = kmi
     return kmi.properties
 
 
+def get_keymap_item_data(item_key: tuple) -> dict:
+    """Get the arguments and the set properties of a keymap item created by register_keymap_item,
+    in a form that can be passed back to it."""
+    idname, key, value, shift, ctrl, alt, oskey, keymap_context = item_key
+    properties = keymap_items[item_key].properties
+    set_properties = {}
+    if properties:
+        for prop in properties.bl_rna.properties:
+            name = prop.identifier
+            if name != "rna_type" and properties.is_property_set(name):
+                prop_value = getattr(properties, name)
+                if not isinstance(prop_value, (str, int, float, bool)):
+                    prop_value = list(prop_value)
+                set_properties[name] = prop_value
+
+    return {
+        "operator": idname,
+        "key": key,
+        "value": value,
+        "shift": shift,
+        "ctrl": ctrl,
+        "alt": alt,
+        "oskey": oskey,
+        "keymap_context": keymap_context,
+        "properties": set_properties,
+    }
+
+
+def remove_module_keymap_items(module_names: set[str]):
+    """Remove the keymap items for operators defined in the given modules"""
+    for item_key, module_name in list(keymap_item_modules.items()):
+        if module_name not in module_names:
+            continue
+        del keymap_item_modules[item_key]
+        kmi = keymap_items.pop(item_key, None)
+        if not kmi:
+            continue
+        km = keymaps[item_key[-1]]
+        km.keymap_items.remove(kmi)
+
+
 def unregister():
     wm = bpy.context.window_manager
     for km in addon_keymaps:
@@ -47,3 +109,6 @@ def unregister():
             km.keymap_items.remove(kmi)
         # wm.keyconfigs.addon.keymaps.remove(km)
     addon_keymaps.clear()
+    keymaps.clear()
+    keymap_items.clear()
+    keymap_item_modules.clear()
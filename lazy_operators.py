@@ -0,0 +1,241 @@
+import importlib
+from types import ModuleType
+
+import bpy
+from bpy.types import Operator
+
+from .btypes import BOperatorBase, CustomPropertyType, property_groups
+from .keymap import get_keymap_item_data, keymap_item_modules, register_keymap_item
+from .profiler import ProfileCategory, profile
+
+"""Lazy registration of operators.
+Instead of importing an operator module when the addon is enabled, a lightweight proxy operator is registered
+using data stored in the registration manifest (see auto_load.py). The real module is imported the first time
+the operator is polled, invoked, executed or drawn, and its class body is then copied onto the proxy.
+
+Only modules that contain nothing but @BOperator operators with simple properties, and that have no
+register/unregister functions can be loaded lazily. Modules can opt out by setting `__no_lazy__ = True`."""
+
+__no_reload__ = True
+
+# The functions that are called by Blender on the operator, which will trigger the real module to be loaded.
+LOADER_FUNCTIONS = ("poll", "invoke", "execute", "modal", "draw")
+
+# Functions that Blender only looks for when the operator is registered, so they can't be added later.
+UNSUPPORTED_FUNCTIONS = ("cancel", "check")
+
+# Attributes of the real class that shouldn't be copied to the proxy
+SKIPPED_ATTRIBUTES = {"__dict__", "__weakref__", "__module__", "__annotations__", "__doc__", "__qualname__"}
+
+
+class NotLazyError(Exception):
+    """Raised when a module can't be loaded lazily"""
+
+
+# Serialization
+#################################################
+
+
+def serialize_value(value):
+    """Convert a property argument to a json compatible value, or raise NotLazyError if that's not possible."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (set, frozenset)):
+        return {"set": sorted(serialize_value(v) for v in value)}
+    if isinstance(value, (list, tuple)):
+        return [serialize_value(v) for v in value]
+    raise NotLazyError(f"Cannot store {value!r} in the manifest")
+
+
+def deserialize_value(value):
+    if isinstance(value, dict):
+        return set(value["set"])
+    if isinstance(value, list):
+        # Blender expects tuples for things like enum items
+        return tuple(deserialize_value(v) for v in value)
+    return value
+
+
+def serialize_property(prop) -> dict:
+    if not isinstance(prop, bpy.props._PropertyDeferred):
+        raise NotLazyError(f"{prop!r} is not a blender property")
+    return {
+        "function": prop.function.__name__,
+        "keywords": {k: serialize_value(v) for k, v in prop.keywords.items()},
+    }
+
+
+def deserialize_property(data: dict):
+    function = getattr(bpy.props, data["function"])
+    return function(**{k: deserialize_value(v) for k, v in data["keywords"].items()})
+
+
+def get_operator_properties(cls) -> dict:
+    """Get all property annotations defined on an operator class and its bases"""
+    annotations = {}
+    for base in reversed(cls.__mro__):
+        annotations.update(base.__dict__.get("__annotations__", {}))
+    prop_types = (bpy.props._PropertyDeferred, CustomPropertyType)
+    return {name: prop for name, prop in annotations.items() if isinstance(prop, prop_types)}
+
+
+# Storing lazy operator data
+#################################################
+
+
+def get_lazy_module_data(module: ModuleType, ordered_classes: list) -> dict:
+    """Get the data needed to register proxies for all of the classes in a module.
+    Raises NotLazyError if the module cannot be loaded lazily."""
+    if getattr(module, "__no_lazy__", False):
+        raise NotLazyError("Module has opted out of lazy loading")
+    if hasattr(module, "register") or hasattr(module, "unregister"):
+        raise NotLazyError("Module has register or unregister functions")
+    if any(pgroup.cls.__module__ == module.__name__ for pgroup in property_groups):
+        raise NotLazyError("Module defines property groups")
+
+    classes = [cls for cls in ordered_classes if cls.__module__ == module.__name__]
+    if not classes:
+        raise NotLazyError("Module has no classes to register")
+
+    operators = {}
+    for cls in classes:
+        operators[cls.__name__] = get_lazy_operator_data(cls)
+
+    keymap_items = [
+        get_keymap_item_data(item_key)
+        for item_key, module_name in keymap_item_modules.items()
+        if module_name == module.__name__
+    ]
+    # Make sure that the keymap item properties are valid
+    serialize_value([list(item["properties"].values()) for item in keymap_items])
+
+    return {"operators": operators, "keymap_items": keymap_items}
+
+
+def get_lazy_operator_data(cls) -> dict:
+    if not issubclass(cls, BOperatorBase) or cls.__bases__[2:] != (Operator,):
+        raise NotLazyError(f"{cls.__name__} is not a BOperator")
+
+    body = cls.__bases__[1]
+    if body.__bases__ != (Operator,):
+        raise NotLazyError(f"{cls.__name__} inherits from other classes")
+    if any(hasattr(body, name) for name in UNSUPPORTED_FUNCTIONS):
+        raise NotLazyError(f"{cls.__name__} defines functions that can't be loaded lazily")
+
+    properties = {}
+    for name, prop in get_operator_properties(cls).items():
+        if isinstance(prop, CustomPropertyType):
+            raise NotLazyError(f"{cls.__name__} has custom properties")
+        properties[name] = serialize_property(prop)
+
+    return {
+        "bl_idname": cls.bl_idname,
+        "bl_label": cls.bl_label,
+        "bl_options": sorted(cls.bl_options),
+        # When dynamic_description is used, bl_description is a property rather than a string.
+        "bl_description": None if "bl_description" in properties else cls.bl_description,
+        "cache_poll": cls._cache_poll,
+        "job": cls._job_mode,
+        "properties": properties,
+    }
+
+
+# Registering proxies
+#################################################
+
+
+def load_lazy_module(module_name: str, data: dict) -> dict[str, type]:
+    """Create the proxy operators for a module, and create its keymap items.
+    Returns a dictionary of class names to proxy classes."""
+    proxies = {name: create_lazy_operator(module_name, name, op_data) for name, op_data in data["operators"].items()}
+
+    for item in data["keymap_items"]:
+        item = item.copy()
+        properties = register_keymap_item(item.pop("operator"), **{k: v for k, v in item.items() if k != "properties"})
+        for name, value in item["properties"].items():
+            setattr(properties, name, value)
+
+    return proxies
+
+
+def create_lazy_operator(module_name: str, class_name: str, data: dict):
+    """Create a proxy for an operator that has the same idname, label, options and properties,
+    but only imports the module that defines it when it is first used."""
+
+    def load_real_operator():
+        """Import the real operator, and copy its class body onto the proxy."""
+        with profile(ProfileCategory.LAZY_IMPORT, module_name):
+            real_cls = getattr(importlib.import_module(module_name), class_name)
+        body = real_cls.__bases__[1]
+
+        for name in LOADER_FUNCTIONS:
+            delattr(LazyBody, name)
+        for name, value in body.__dict__.items():
+            if name not in SKIPPED_ATTRIBUTES:
+                setattr(LazyBody, name, value)
+        return body
+
+    class LazyBody:
+        """Stands in for the body of the operator class until it is loaded.
+        Each of these functions is only called once, after which it is replaced with the real one (if it exists)."""
+
+        __annotations__ = {}
+
+        @classmethod
+        def poll(cls, context):
+            load_real_operator()
+            if "poll" in LazyBody.__dict__:
+                return LazyBody.__dict__["poll"].__get__(None, cls)(context)
+            return True
+
+        def invoke(self, context, event):
+            load_real_operator()
+            if "invoke" in LazyBody.__dict__:
+                return LazyBody.invoke(self, context, event)
+            return self.execute(context)
+
+        def execute(self, context):
+            load_real_operator()
+            if "execute" in LazyBody.__dict__:
+                return LazyBody.execute(self, context)
+
+        def modal(self, context, event):
+            load_real_operator()
+            return LazyBody.modal(self, context, event)
+
+        def draw(self, context):
+            load_real_operator()
+            if "draw" in LazyBody.__dict__:
+                return LazyBody.draw(self, context)
+            self.layout.label(text="This is my awesome operator.")
+
+    namespace = {
+        "bl_idname": data["bl_idname"],
+        "bl_label": data["bl_label"],
+        "bl_options": set(data["bl_options"]),
+        "__annotations__": {name: deserialize_property(prop) for name, prop in data["properties"].items()},
+        "__module__": module_name,
+        "__no_reg__": False,
+        "__lazy__": True,
+        "_cache_poll": data["cache_poll"],
+        "_job_mode": data["job"],
+    }
+
+    if data["bl_description"] is None:
+        # Mirrors the dynamic description created by the BOperator decorator
+        default_description = data["properties"]["bl_description"]["keywords"].get("default", "")
+
+        def description(cls, context, props) -> str:
+            return props.bl_description if props else default_description
+
+        namespace["description"] = classmethod(description)
+    else:
+        namespace["bl_description"] = data["bl_description"]
+
+    LazyOperator = type(class_name, (BOperatorBase, LazyBody, Operator), namespace)
+    LazyOperator.__qualname__ = class_name
+    return LazyOperator
+
+
+def is_lazy_operator(cls) -> bool:
+    return getattr(cls, "__lazy__", False)
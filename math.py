@@ -270,3 +270,98 @@ class Rectangle:
             amount = V((amount, amount))
         self.min -= amount
         self.max += amount
+
+
+class Shelf:
+    """A row of a ShelfPacker, with the spans of it that are still free"""
+
+    __slots__ = ["y", "height", "free"]
+
+    def __init__(self, y: int, height: int, width: int):
+        self.y = y
+        self.height = height
+        self.free: list[tuple[int, int]] = [(0, width)]
+        "The (x, width) of each free span, ordered by x"
+
+    def find_span(self, width: int) -> int:
+        """Return the index of the first free span that is at least as wide as width, or -1"""
+        for i, (_, span_width) in enumerate(self.free):
+            if span_width >= width:
+                return i
+        return -1
+
+
+class ShelfPacker:
+    """Packs rectangles into a fixed size area, by placing them in rows (shelves) from left to right.
+    Each shelf is as tall as the first rectangle placed in it, and later rectangles go in the shortest shelf they fit in.
+    Removing a rectangle frees its space in its shelf, so rectangles can be added and removed without moving any others.
+    """
+
+    def __init__(self, width: int, height: int, padding: int = 1):
+        self.width = width
+        self.height = height
+        self.padding = padding
+        "Empty space left around each rectangle, to stop neighbours bleeding into each other when sampled"
+        self.shelves: list[Shelf] = []
+        self.top = 0
+        "The y coordinate where the next new shelf would start"
+        # Don't place rectangles in shelves much taller than them, as that wastes the space above them
+        self.max_waste = 0.3
+
+    def insert(self, width: int, height: int) -> Rectangle | None:
+        """Find space for a rectangle, and return where it was placed, or None if it doesn't fit"""
+        width += self.padding * 2
+        height += self.padding * 2
+        best: tuple[Shelf, int] | None = None
+        for shelf in self.shelves:
+            if not height <= shelf.height <= height / (1 - self.max_waste):
+                continue
+            if best and shelf.height >= best[0].height:
+                continue
+            if (index := shelf.find_span(width)) >= 0:
+                best = (shelf, index)
+
+        if best is None:
+            if self.top + height > self.height or width > self.width:
+                return None
+            shelf = Shelf(self.top, height, self.width)
+            self.shelves.append(shelf)
+            self.top += height
+            best = (shelf, 0)
+
+        shelf, index = best
+        x, span_width = shelf.free[index]
+        if span_width > width:
+            shelf.free[index] = (x + width, span_width - width)
+        else:
+            del shelf.free[index]
+        return Rectangle(
+            (x + self.padding, shelf.y + self.padding),
+            (x + width - self.padding, shelf.y + height - self.padding),
+        )
+
+    def remove(self, rectangle: Rectangle):
+        """Free the space used by a rectangle returned by insert"""
+        x = int(rectangle.minx) - self.padding
+        y = int(rectangle.miny) - self.padding
+        width = int(rectangle.width) + self.padding * 2
+        shelf = next(shelf for shelf in self.shelves if shelf.y == y)
+
+        # Add the span back, merging it with its neighbours
+        spans = sorted(shelf.free + [(x, width)])
+        merged = [spans[0]]
+        for span_x, span_width in spans[1:]:
+            last_x, last_width = merged[-1]
+            if last_x + last_width == span_x:
+                merged[-1] = (last_x, last_width + span_width)
+            else:
+                merged.append((span_x, span_width))
+        shelf.free = merged
+
+        # Reclaim empty shelves at the top, so that they can be used for rectangles of a different height
+        while self.shelves and self.shelves[-1].free == [(0, self.width)]:
+            self.top -= self.shelves.pop().height
+
+    def clear(self):
+        self.shelves.clear()
+        self.top = 0
@@ -4,6 +4,7 @@ from sd_tools.node_editor.context_menu.context_menu_ops import get_base_socket_t
 
 from ...bhelpers import BNodeTree
 from ...btypes import BMenu
+from ...profiler import ProfileCategory, profile
 from .context_menu_ops import (
     SD_OT_collapse_group_input_nodes as collapse_group_inputs_op,
 )
@@ -47,7 +48,8 @@ common_types = {
 }
 compatible_with |= {k: common_types for k in common_types}
 compatible_with = {k: v | {k} for k, v in compatible_with.items()}
-theme = bpy.context.preferences.themes[0].node_editor
+with profile(ProfileCategory.SIDE_EFFECT, "Read node editor theme"):
+    theme = bpy.context.preferences.themes[0].node_editor
 
 
 @BMenu(label="Connect to group input")
@@ -103,19 +105,21 @@ class SD_MT_named_attribute_menu(btypes.Menu):
 
 def button_context_menu_draw(self, context):
     layout: btypes.UILayout = self.layout
-    operators = [extract_prop_op, connect_to_group_input_op]
-    for op in operators:
-        if op.poll(context):
-            layout.separator()
-            break
+    # Each poll function is only called once, as this is drawn every time the context menu is opened
+    show_extract_prop = extract_prop_op.poll(context)
+    show_named_attr = extract_to_named_attr_op.poll(context)
+    show_group_input = connect_to_group_input_op.poll(context)
 
-    if extract_prop_op.poll(context):
+    if show_extract_prop or show_group_input:
+        layout.separator()
+
+    if show_extract_prop:
         layout.operator(extract_prop_op.bl_idname, icon="NODE")
 
-    if extract_to_named_attr_op.poll(context):
+    if show_named_attr:
         layout.menu(SD_MT_named_attribute_menu.bl_idname, icon="NODE")
 
-    if connect_to_group_input_op.poll(context):
+    if show_group_input:
         layout.menu(SD_MT_group_input_menu.bl_idname, icon="NODE")
 
 
@@ -124,25 +128,21 @@ def node_context_menu_draw(self, context):
     layout.operator_context = "INVOKE_DEFAULT"
 
     operators = [extract_node_op, rename_group_socket_op, collapse_group_inputs_op]
-    for op in operators:
-        if op.poll(context):
-            layout.separator()
-            break
+    shown = [op for op in operators if op.poll(context)]
+    if shown:
+        layout.separator()
 
-    operator = extract_node_op
-    if operator.poll(context):
+    if extract_node_op in shown:
         layout.separator()
-        layout.operator(operator.bl_idname, icon="NODE")
+        layout.operator(extract_node_op.bl_idname, icon="NODE")
         # op = layout.operator(operator.bl_idname, text=operator.bl_label + " (without subtype)", icon="NODE")
         # op.with_subtype = False
 
-    operator = rename_group_socket_op
-    if operator.poll(context):
-        layout.operator(operator.bl_idname, icon="NODE")
+    if rename_group_socket_op in shown:
+        layout.operator(rename_group_socket_op.bl_idname, icon="NODE")
 
-    operator = collapse_group_inputs_op
-    if operator.poll(context):
-        layout.operator(operator.bl_idname, icon="NODE")
+    if collapse_group_inputs_op in shown:
+        layout.operator(collapse_group_inputs_op.bl_idname, icon="NODE")
 
 
 def register():
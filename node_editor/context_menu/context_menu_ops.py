@@ -88,7 +88,7 @@ def update_modifier_input_value(node_tree: NodeTree, inputs_dict: dict, value: A
                     modifier[new_key] = value
 
 
-@BOperator("sd", label="Extract to node", undo=True)
+@BOperator("sd", label="Extract to node", undo=True, cache_poll=True)
 class SD_OT_extract_node_prop(BOperator.type):
     """Extract this value from a node into a separate input node"""
 
@@ -155,7 +155,7 @@ class SD_OT_extract_node_prop(BOperator.type):
         node_tree.links.new(output, socket)
 
 
-@BOperator("sd", label="Extract to named attribute", undo=True)
+@BOperator("sd", label="Extract to named attribute", undo=True, cache_poll=True)
 class SD_OT_extract_node_prop_to_named_attr(BOperator.type):
     """Extract this value to a named attribute"""
 
@@ -229,7 +229,7 @@ class SD_OT_extract_node_prop_to_named_attr(BOperator.type):
         return self.FINISHED
 
 
-@BOperator("sd", label="Extract to new group input", undo=True)
+@BOperator("sd", label="Extract to new group input", undo=True, cache_poll=True)
 class SD_OT_extract_node_prop_to_group_input(BOperator.type):
     """Extract this property as an input parameter for this node group"""
 
@@ -282,7 +282,7 @@ class SD_OT_extract_node_prop_to_group_input(BOperator.type):
                 node.outputs[new_socket.name].hide = True
 
 
-@BOperator("sd", label="Extract to group input", undo=True)
+@BOperator("sd", label="Extract to group input", undo=True, cache_poll=True)
 class SD_OT_extract_node_to_group_input(BOperator.type):
     """Extract this node as an input parameter for this node group"""
 
@@ -311,10 +311,7 @@ class SD_OT_extract_node_to_group_input(BOperator.type):
             return False
 
         # Check to see whether this is a material or compositor, rather than a node group
-        for ng in bpy.data.node_groups:
-            if ng == node_tree:
-                break
-        else:
+        if node_tree.is_embedded_data:
             return False
 
         if not node_tree.nodes.active or node_tree.nodes.active.bl_idname not in cls.types:
@@ -410,7 +407,7 @@ class SD_OT_extract_node_to_group_input(BOperator.type):
         node_tree.nodes.remove(node)
 
 
-@BOperator("sd", label="Connect to group input", undo=True)
+@BOperator("sd", label="Connect to group input", undo=True, cache_poll=True)
 class SD_OT_connect_prop_to_group_input(BOperator.type):
     """Connect this input to an existing group input"""
 
@@ -452,7 +449,7 @@ class SD_OT_connect_prop_to_group_input(BOperator.type):
         links.new(output, socket)
 
 
-@BOperator("sd", label="Edit socket", undo=True)
+@BOperator("sd", label="Edit socket", undo=True, cache_poll=True)
 class SD_OT_edit_group_socket_from_node(BOperator.type):
     """Edit the last linked socket of the currently selected group input/output"""
 
@@ -466,10 +463,7 @@ class SD_OT_edit_group_socket_from_node(BOperator.type):
             return False
 
         # Check to see whether this is a material or compositor, rather than a node group
-        for ng in bpy.data.node_groups:
-            if ng == node_tree:
-                break
-        else:
+        if node_tree.is_embedded_data:
             return False
 
         node = node_tree.nodes.active
@@ -539,7 +533,7 @@ class SD_OT_edit_group_socket_from_node(BOperator.type):
         socket.draw(context, layout)
 
 
-@BOperator("sd", label="Collapse unused inputs", undo=True)
+@BOperator("sd", label="Collapse unused inputs", undo=True, cache_poll=True)
 class SD_OT_collapse_group_input_nodes(BOperator.type):
     """Hide all unused sockets from all of the group input nodes in this node tree"""
 
@@ -553,10 +547,7 @@ class SD_OT_collapse_group_input_nodes(BOperator.type):
             return False
 
         # Check to see whether this is a material or compositor, rather than a node group
-        for ng in bpy.data.node_groups:
-            if ng == node_tree:
-                break
-        else:
+        if node_tree.is_embedded_data:
             return False
         return True
 
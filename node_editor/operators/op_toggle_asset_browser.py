@@ -2,6 +2,7 @@ import bpy
 from bpy.types import KeyMap
 
 from ...btypes import BOperator
+from ...handlers import AppTimer
 
 
 @BOperator()
@@ -57,7 +58,7 @@ class SD_OT_toggle_asset_browser(BOperator.type):
                 new_area.spaces.active.params.catalog_id = "6fc1d979-f680-4327-9e77-adec8e1adcae"
 
         # the context needs to be updated first, so wait until that's done
-        bpy.app.timers.register(change_active_library, first_interval=0.001)
+        AppTimer(change_active_library, first_interval=0.001)
         # print(dir(new_area.spaces[0].params))
         # new_area.spaces[0].params.asset_library_ref = "Assets"
         # new_area.spaces
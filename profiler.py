@@ -0,0 +1,106 @@
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import bpy
+
+from .constants import Files
+
+"""Records how long the different parts of enabling the addon take,
+such as importing each module and registering each class."""
+
+__no_reload__ = True
+
+
+class ProfileCategory:
+    """The kinds of things that can be profiled"""
+
+    IMPORT = "IMPORT"
+    "Importing a submodule"
+    LAZY_IMPORT = "LAZY_IMPORT"
+    "Importing a module the first time one of its lazy operators is used"
+    REGISTER_CLASS = "REGISTER_CLASS"
+    "Calling bpy.utils.register_class on a class"
+    REGISTER_MODULE = "REGISTER_MODULE"
+    "Calling the register() function of a module"
+    SIDE_EFFECT = "SIDE_EFFECT"
+    "Work done while a module is imported, such as creating keymap items"
+    LOADER = "LOADER"
+    "Work done by auto_load itself, like finding modules and reading the manifest"
+
+
+@dataclass
+class ProfileEntry:
+    category: str
+    name: str
+    start: float
+    "The time this started at, relative to when the profiler was first imported"
+    duration: float
+    "The total time this took in seconds"
+    self_duration: float
+    "The time this took, minus the time of any profiled entries that happened during it"
+
+
+start_time = time.perf_counter()
+entries: list[ProfileEntry] = []
+# The durations of the children of the entries that are currently being profiled
+_child_durations: list[float] = []
+
+
+@contextmanager
+def profile(category: str, name: str):
+    """Record how long the code inside this context manager takes to run.
+    ```
+    with profile(ProfileCategory.SIDE_EFFECT, "Read theme"):
+        theme = bpy.context.preferences.themes[0]
+    ```"""
+    _child_durations.append(0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        child_duration = _child_durations.pop()
+        if _child_durations:
+            _child_durations[-1] += duration
+        entries.append(ProfileEntry(category, name, start - start_time, duration, duration - child_duration))
+
+
+def get_entries(sort_by: str = "duration", reverse: bool = True, category: str = "") -> list[ProfileEntry]:
+    """Get the recorded entries, sorted by one of their attributes, and optionally filtered by category"""
+    filtered = [e for e in entries if e.category == category] if category else entries
+    return sorted(filtered, key=lambda e: getattr(e, sort_by), reverse=reverse)
+
+
+def get_totals() -> dict[str, float]:
+    """Get the total time spent in each category, not including time spent in other profiled entries"""
+    totals = {}
+    for entry in entries:
+        totals[entry.category] = totals.get(entry.category, 0) + entry.self_duration
+    return totals
+
+
+def to_dict() -> dict:
+    return {
+        "blender_version": list(bpy.app.version),
+        "background": bpy.app.background,
+        "total": sum(get_totals().values()),
+        "totals": get_totals(),
+        "entries": [asdict(e) for e in entries],
+    }
+
+
+def dump_json(path: Path | str = "") -> Path:
+    """Write all of the recorded entries to a json file, and return its path.
+    The default location is in the addon cache directory"""
+    path = Path(path) if path else Files.STARTUP_PROFILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(to_dict(), f, indent=2)
+    return path
+
+
+def clear():
+    entries.clear()
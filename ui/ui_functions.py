@@ -1,7 +1,8 @@
 import bpy
-import blf
 from bpy.types import UILayout, Context
 
+from ..drawing import wrap_lines
+
 """For useful functions related to UI"""
 
 
@@ -48,29 +49,14 @@ def multi_line_operator(
 
 def wrap_text(self, context: Context, text: str, layout: UILayout, centered: bool = False) -> list[str]:
     """Take a string and draw it over multiple lines so that it is never concatenated."""
-    return_text = []
-    row_text = ''
-
     width = context.region.width
     system = context.preferences.system
     ui_scale = system.ui_scale
     width = (4 / (5 * ui_scale)) * width
 
-    dpi = 72 if system.ui_scale >= 1 else system.dpi
-    blf.size(0, 11, dpi)
-
-    for word in text.split():
-        word = f' {word}'
-        line_len, _ = blf.dimensions(0, row_text + word)
-
-        if line_len <= (width - 16):
-            row_text += word
-        else:
-            return_text.append(row_text)
-            row_text = word
-
-    if row_text:
-        return_text.append(row_text)
+    # blf.size no longer takes a dpi, so scale the size instead
+    size = 11 if ui_scale >= 1 else 11 * system.dpi / 72
+    return_text = list(wrap_lines(text, width - 16, size))
 
     for text in return_text:
         row = layout.row()